@@ -0,0 +1,35 @@
+"""
+Measure the throughput of batched moves, in states per second.
+Run with `python -m benchmarks.bench_batch`.
+"""
+
+import torch
+
+from benchmarks.utils import measure
+from rubik.batch import CubeBatch
+
+
+SIZES = [2, 3, 5, 10]
+
+
+def bench_rotate_once(size: int, num_cubes: int = 10000, num_moves: int = 20) -> float:
+    """
+    Number of states produced per second when applying a random move to each cube of a batch.
+    """
+    batch = CubeBatch(size, num_cubes)
+    generator = torch.Generator().manual_seed(0)
+    axes = torch.randint(0, 3, (num_moves, num_cubes), generator=generator)
+    slices = torch.randint(0, size, (num_moves, num_cubes), generator=generator)
+    inverses = torch.randint(0, 2, (num_moves, num_cubes), generator=generator)
+
+    def run():
+        for step in range(num_moves):
+            batch.rotate_once(axes[step], slices[step], inverses[step])
+
+    return num_cubes * num_moves / measure(run, number=1)
+
+
+if __name__ == "__main__":
+    print(f"{'size':>6} {'states/sec':>14}")
+    for size in SIZES:
+        print(f"{size:>6} {bench_rotate_once(size):>14,.0f}")
@@ -0,0 +1,94 @@
+"""
+Compare the combination of moves with a balanced reduction of batched gathers against sequential gathers,
+as done by "compose_actions" on either side of BALANCED_MAX_LENGTH, and against the baselines: a scramble
+rotating the cube through parsed move strings, one gather per move, and a composition of moves folding their
+permutations from left to right.
+Run with `python -m benchmarks.bench_compose`.
+"""
+
+from functools import reduce
+
+import torch
+
+from benchmarks.utils import measure
+from rubik.action import compose_actions, parse_actions_str, sample_actions, sample_actions_str
+from rubik.cube import Cube
+
+
+SIZES = [3, 5, 7, 10, 20, 50, 100]
+
+
+def bench_scramble_baseline(size: int, num_moves: int = 10000) -> float:
+    """
+    Duration of a scramble sampling a move string, parsing it and gathering the state once per move.
+    """
+    cube = Cube(size)
+
+    def run():
+        for action in parse_actions_str(sample_actions_str(num_moves, size)):
+            cube.state = torch.gather(cube.state, 0, cube.actions[action])
+
+    return measure(run, number=1, repeat=3)
+
+
+def bench_scramble_balanced(size: int, num_moves: int = 10000) -> float:
+    """
+    Duration of a scramble combining sampled moves with balanced reductions, whatever the size.
+    """
+    cube = Cube(size)
+    moves = sample_actions(num_moves, size)
+    return measure(lambda: compose_actions(cube.actions, moves, max_length=cube.actions.shape[-1]), number=1, repeat=3)
+
+
+def bench_scramble(size: int, num_moves: int = 10000) -> float:
+    """
+    Duration of "Cube.scramble".
+    """
+    cube = Cube(size)
+    return measure(lambda: cube.scramble(num_moves), number=1, repeat=3)
+
+
+def bench_compose_moves_baseline(size: int, num_moves: int = 1000) -> float:
+    """
+    Duration of a composition of moves folding their permutations from left to right.
+    """
+    cube = Cube(size)
+    moves = sample_actions_str(num_moves, size)
+
+    def run():
+        tensors = [cube.actions[action] for action in parse_actions_str(moves)]
+        return reduce(lambda A, B: torch.gather(A, 0, B), tensors)
+
+    return measure(run, number=1, repeat=3)
+
+
+def bench_compose_moves(size: int, num_moves: int = 1000) -> float:
+    """
+    Duration of "Cube.compose_moves", the cache of compositions being cleared.
+    """
+    cube = Cube(size)
+    moves = sample_actions_str(num_moves, size)
+
+    def run():
+        cube._compositions.clear()
+        return cube.compose_moves(moves)
+
+    return measure(run, number=1, repeat=3)
+
+
+if __name__ == "__main__":
+    print(f"{'size':>6} {'baseline (ms)':>14} {'compose (ms)':>14} {'speedup':>8}")
+    for size in SIZES:
+        baseline = bench_compose_moves_baseline(size)
+        compose = bench_compose_moves(size)
+        print(f"{size:>6} {baseline * 1e3:>14.1f} {compose * 1e3:>14.1f} {baseline / compose:>8.2f}")
+
+    print(f"{'size':>6} {'baseline (ms)':>14} {'balanced (ms)':>14} {'scramble (ms)':>14} {'speedup':>8}")
+    for size in SIZES:
+        baseline = bench_scramble_baseline(size)
+        balanced = bench_scramble_balanced(size)
+        scramble = bench_scramble(size)
+        print(
+            f"{size:>6} {baseline * 1e3:>14.1f} {balanced * 1e3:>14.1f} {scramble * 1e3:>14.1f} "
+            f"{baseline / scramble:>8.2f}"
+        )
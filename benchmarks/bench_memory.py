@@ -0,0 +1,29 @@
+"""
+Report the memory used by the tables of actions of a cube, in dense and compact layouts.
+Run with `python -m benchmarks.bench_memory`.
+"""
+
+from rubik.action import CompactActions, SparseChanges, build_actions_tensor
+
+
+SIZES = [2, 3, 5, 10, 20, 50, 100]
+
+
+def bench_actions_nbytes(size: int) -> dict[str, int]:
+    """
+    Number of bytes used by each layout of the tables of actions of a cube.
+    """
+    actions = build_actions_tensor(size)
+    return {
+        "dense": actions.nbytes,
+        "compact": CompactActions.from_actions(actions).nbytes,
+        "changes": SparseChanges.from_actions(actions).nbytes,
+    }
+
+
+if __name__ == "__main__":
+    print(f"{'size':>6} {'dense (MB)':>12} {'compact (MB)':>13} {'changes (MB)':>13} {'ratio':>6}")
+    for size in SIZES:
+        nbytes = bench_actions_nbytes(size)
+        (dense, compact, changes) = (nbytes["dense"], nbytes["compact"], nbytes["changes"])
+        print(f"{size:>6} {dense / 1e6:>12.3f} {compact / 1e6:>13.3f} {changes / 1e6:>13.3f} {dense / compact:>6.1f}")
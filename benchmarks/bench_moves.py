@@ -0,0 +1,48 @@
+"""
+Compare the dense (full-length gather) and sparse (in-place copy of changed facelets) application of moves.
+"Cube.rotate_once" gathers by default, in-place copies being opt-in through its "sparse" argument.
+Run with `python -m benchmarks.bench_moves`.
+"""
+
+from benchmarks.utils import measure
+from rubik.action import parse_actions_str, sample_actions_str
+from rubik.cube import Cube
+
+
+SIZES = [3, 10, 50, 100]
+
+
+def bench_rotate_once_dense(size: int, num_moves: int = 100) -> float:
+    """
+    Average duration of a move applied with a gather over the full state.
+    """
+    cube = Cube(size)
+    actions = parse_actions_str(sample_actions_str(num_moves, size))
+
+    def run():
+        for action in actions:
+            cube.rotate_once(*action)
+
+    return measure(run, number=1) / num_moves
+
+
+def bench_rotate_once_sparse(size: int, num_moves: int = 100) -> float:
+    """
+    Average duration of a move applied in-place to the changed facelets only.
+    """
+    cube = Cube(size)
+    actions = parse_actions_str(sample_actions_str(num_moves, size))
+
+    def run():
+        for action in actions:
+            cube.rotate_once(*action, sparse=True)
+
+    return measure(run, number=1) / num_moves
+
+
+if __name__ == "__main__":
+    print(f"{'size':>6} {'dense (us)':>12} {'sparse (us)':>12} {'speedup':>8}")
+    for size in SIZES:
+        dense = bench_rotate_once_dense(size)
+        sparse = bench_rotate_once_sparse(size)
+        print(f"{size:>6} {dense * 1e6:>12.1f} {sparse * 1e6:>12.1f} {dense / sparse:>8.2f}")
@@ -0,0 +1,98 @@
+"""
+Measure the latency of rendering a cube as a 3D figure, in milliseconds, and the size of the figure sent
+after an update following a single move, in bytes. The size of the patch of colors changed by that move is
+reported alongside: patches update the figure of a session on the server only, and are never sent.
+Also compare the render time and figure size of levels of detail: full mesh, merged mesh and 2D net.
+Run with `python -m benchmarks.bench_plot`.
+"""
+
+import json
+
+from benchmarks.utils import measure
+from rubik.cube import Cube
+from rubik.interface.plot import CubeVisualizer
+
+
+SIZES = [3, 10, 50, 100]
+LOD_SIZES = [10, 50, 100]
+LOD_MODES = ["mesh", "merged", "net"]
+
+
+def bench_render(size: int) -> float:
+    """
+    Duration of rendering a scrambled cube, in milliseconds.
+    """
+    cube = Cube(size)
+    cube.scramble(100)
+    visualizer = CubeVisualizer(size)
+    return 1000 * measure(lambda: visualizer(cube.coordinates, cube.state, cube.size), number=1)
+
+
+def bench_update(size: int) -> float:
+    """
+    Duration of updating the figure of a session after a single move, in milliseconds.
+    """
+    cube = Cube(size)
+    visualizer = CubeVisualizer(size)
+    visualizer.update(cube.state)
+
+    def run():
+        cube.rotate("X0")
+        visualizer.update(cube.state)
+
+    return 1000 * measure(run, number=1)
+
+
+def bench_update_bytes(size: int) -> tuple[int, int]:
+    """
+    Number of bytes sent to the browser after a single move, that is the whole figure, along with the number
+    of bytes of the patch of colors changed by that move, which is not sent.
+    """
+    cube = Cube(size)
+    cube.scramble(100)
+    visualizer = CubeVisualizer(size)
+    visualizer.update(cube.state)
+    previous = cube.state.clone()
+    cube.rotate("X0")
+    figure_bytes = len(visualizer.update(cube.state).to_json())
+
+    # patch of another session displaying the previous state, so that it only holds the colors of the move
+    patcher = visualizer.fork()
+    patcher.patch(previous)
+    patch_bytes = len(json.dumps(patcher.patch(cube.state)))
+    return (figure_bytes, patch_bytes)
+
+
+def bench_lod(size: int, mode: str, num_moves: int = 100) -> tuple[float, int]:
+    """
+    Duration of rendering a scrambled cube, in milliseconds, and size of the resulting figure, in bytes,
+    for a level of detail among "mesh" (2 triangles per facelet), "merged" (2 triangles per rectangle of
+    same-colored facelets) and "net" (2D heatmap).
+    """
+    cube = Cube(size)
+    cube.scramble(num_moves)
+    visualizer = CubeVisualizer(size, merge_size=size if mode == "mesh" else 0)
+
+    def render():
+        if mode == "net":
+            return visualizer.build_net_figure(cube.facelets, cube.colors)
+        return visualizer(cube.coordinates, cube.state, cube.size)
+
+    return (1000 * measure(render, number=1), len(render().to_json()))
+
+
+if __name__ == "__main__":
+    print(f"{'size':>6} {'render (ms)':>14} {'update (ms)':>14} {'sent (B)':>14} {'patch, unsent (B)':>18}")
+    for size in SIZES:
+        (figure_bytes, patch_bytes) = bench_update_bytes(size)
+        print(
+            f"{size:>6} {bench_render(size):>14,.1f} {bench_update(size):>14,.1f} "
+            f"{figure_bytes:>14,} {patch_bytes:>18,}"
+        )
+
+    print()
+    print(f"{'size':>6} {'mode':>8} {'render (ms)':>14} {'figure (B)':>14}")
+    for size in LOD_SIZES:
+        for mode in LOD_MODES:
+            (duration, num_bytes) = bench_lod(size, mode)
+            print(f"{size:>6} {mode:>8} {duration:>14,.1f} {num_bytes:>14,}")
@@ -0,0 +1,36 @@
+"""
+Measure the throughput of breadth-first searches of shortest sequences of moves, in states expanded per second.
+Run with `python -m benchmarks.bench_search`.
+"""
+
+import torch
+
+from rubik.action import sample_actions_str
+from rubik.cube import Cube
+from rubik.search import MoveSearch
+
+
+CASES = [(2, 6, "full"), (3, 4, "full"), (3, 6, "full"), (3, 4, "up")]
+
+
+def bench_search(size: int, num_moves: int, goal: str) -> tuple[int, float, float]:
+    """
+    Number of states expanded, duration in seconds and throughput in states expanded per second of a search
+    undoing a seeded scramble, either of all facelets ("full") or of the Up face only ("up").
+    """
+    cube = Cube(size)
+    cube.rotate(sample_actions_str(num_moves, size, seed=0))
+    mask = None
+    if goal == "up":
+        mask = torch.zeros(6 * size**2, dtype=torch.bool)
+        mask[: size**2] = True
+    engine = MoveSearch(cube)
+    engine(mask, max_depth=num_moves)
+    return (engine.num_expanded, engine.duration, engine.throughput)
+
+
+if __name__ == "__main__":
+    print(f"{'size':>6} {'moves':>6} {'goal':>6} {'expanded':>12} {'time (s)':>10} {'states/sec':>14}")
+    for size, num_moves, goal in CASES:
+        (num_expanded, duration, throughput) = bench_search(size, num_moves, goal)
+        print(f"{size:>6} {num_moves:>6} {goal:>6} {num_expanded:>12,} {duration:>10.3f} {throughput:>14,.0f}")
@@ -0,0 +1,37 @@
+"""
+Measure the time taken to optimally solve seeded scrambles of cubes of size 2 and 3, in seconds.
+Pattern databases are built beforehand, and excluded from timings.
+Run with `python -m benchmarks.bench_solve`.
+"""
+
+import time
+
+from rubik.action import sample_actions_str
+from rubik.cube import Cube
+from rubik.solve import load_pattern_databases, solve
+
+
+SCRAMBLES = (
+    [(2, 6, seed) for seed in range(5)] + [(2, 10, seed) for seed in range(5)] + [(3, 5, seed) for seed in range(5)]
+)
+
+
+def bench_solve(size: int, num_moves: int, seed: int) -> tuple[float, int]:
+    """
+    Duration of solving a seeded scramble, in seconds, along with the number of moves of the solution.
+    """
+    cube = Cube(size)
+    cube.rotate(sample_actions_str(num_moves, size, seed))
+    start = time.perf_counter()
+    solution = solve(cube)
+    return (time.perf_counter() - start, len(solution.split()))
+
+
+if __name__ == "__main__":
+    for size in sorted({size for size, _, _ in SCRAMBLES}):
+        load_pattern_databases(size)
+
+    print(f"{'size':>6} {'moves':>6} {'seed':>6} {'solution':>9} {'time (s)':>10}")
+    for size, num_moves, seed in SCRAMBLES:
+        (duration, length) = bench_solve(size, num_moves, seed)
+        print(f"{size:>6} {num_moves:>6} {seed:>6} {length:>9} {duration:>10.3f}")
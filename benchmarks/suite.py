@@ -0,0 +1,224 @@
+"""
+Measure the duration and peak memory of the main operations of the package across cube sizes, save results
+as json, and compare them against a baseline. Each benchmark runs in a fresh process, so that peak memories
+do not leak from one benchmark to the other. Runs on CPU.
+Run with `python -m benchmarks.suite run --output results.json`, then
+`python -m benchmarks.suite compare baseline.json results.json` to flag regressions.
+"""
+
+import io
+import json
+import os
+import platform
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable
+
+import torch
+from fire import Fire
+
+from benchmarks.utils import measure
+from rubik.action import build_actions_tensor, parse_actions_str, sample_actions_str
+from rubik.cache import read_table
+from rubik.cube import Cube
+from rubik.interface.plot import CubeVisualizer
+
+
+SIZES = [2, 3, 5, 10, 20, 50, 100]
+DEFAULT_THRESHOLD = 0.2
+MIN_PEAK_BYTES = 2**20
+
+
+def setup_actions(size: int) -> Callable[[], object]:
+    """
+    Build the tables of actions of a cube.
+    """
+    return lambda: build_actions_tensor(size)
+
+
+def setup_init(size: int) -> Callable[[], object]:
+    """
+    Create a cube, its tables being read from the on-disk cache.
+    """
+    # fill the on-disk cache first, so that tables are read rather than built
+    for name in ["actions", "changes"]:
+        read_table(name, size)
+    return lambda: Cube(size)
+
+
+def setup_rotate_once(size: int, num_moves: int = 100) -> Callable[[], object]:
+    """
+    Apply moves one at a time to a cube.
+    """
+    cube = Cube(size)
+    actions = parse_actions_str(sample_actions_str(num_moves, size))
+
+    def run():
+        for action in actions:
+            cube.rotate_once(*action)
+
+    return run
+
+
+def setup_scramble(size: int, num_moves: int = 1000) -> Callable[[], object]:
+    """
+    Scramble a cube with random moves combined into a single permutation.
+    """
+    cube = Cube(size)
+    return lambda: cube.scramble(num_moves)
+
+
+def setup_compose_moves(size: int, num_moves: int = 100) -> Callable[[], object]:
+    """
+    Combine a sequence of moves into a single permutation, the cache of compositions being cleared.
+    """
+    cube = Cube(size)
+    moves = sample_actions_str(num_moves, size)
+
+    def run():
+        cube._compositions.clear()
+        return cube.compose_moves(moves)
+
+    return run
+
+
+def setup_facelets(size: int) -> Callable[[], object]:
+    """
+    Gather the colors of facelets of a cube face by face.
+    """
+    cube = Cube(size)
+    cube.scramble(100)
+    return lambda: cube.facelets
+
+
+def setup_str(size: int) -> Callable[[], object]:
+    """
+    Compute the string representation of a cube.
+    """
+    cube = Cube(size)
+    cube.scramble(100)
+    return lambda: str(cube)
+
+
+def setup_visualizer(size: int) -> Callable[[], object]:
+    """
+    Compute the colors of the triangles of the mesh of a cube.
+    """
+    cube = Cube(size)
+    cube.scramble(100)
+    visualizer = CubeVisualizer(size)
+    return lambda: visualizer(cube.coordinates, cube.state, size)
+
+
+def setup_app_rotate(size: int) -> Callable[[], object]:
+    """
+    Restore a session cube, rotate it, serialize it back and update its figure.
+    """
+    # mirror the rotate and display callbacks of the interface, sessions holding serialized cubes
+    file = io.BytesIO()
+    Cube(size).save(file)
+    visualizer = CubeVisualizer(size)
+
+    def run():
+        cube = Cube.load(io.BytesIO(file.getvalue()))
+        cube.rotate("X0 Y1 Z0i")
+        cube.save(io.BytesIO())
+        return visualizer.update(cube.state)
+
+    return run
+
+
+BENCHMARKS: dict[str, Callable[[int], Callable[[], object]]] = {
+    "build_actions_tensor": setup_actions,
+    "Cube.__init__": setup_init,
+    "Cube.rotate_once": setup_rotate_once,
+    "Cube.scramble": setup_scramble,
+    "Cube.compose_moves": setup_compose_moves,
+    "Cube.facelets": setup_facelets,
+    "Cube.__str__": setup_str,
+    "CubeVisualizer.__call__": setup_visualizer,
+    "app.rotate": setup_app_rotate,
+}
+
+
+def run_benchmark(name: str, size: int, number: int, repeat: int) -> dict[str, float]:
+    """
+    Run a single benchmark, and return its best average duration in seconds along with the peak resident
+    memory in bytes allocated beyond the one of the process before setting the benchmark up.
+    """
+    # maximum resident set sizes are reported in kilobytes on Linux
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    func = BENCHMARKS[name](size)
+    seconds = measure(func, number=number, repeat=repeat)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"seconds": seconds, "peak_bytes": (peak_rss - start_rss) * 1024}
+
+
+def run(
+    output: str = "benchmarks.json",
+    sizes: list[int] = SIZES,
+    names: list[str] | None = None,
+    number: int = 1,
+    repeat: int = 3,
+) -> dict:
+    """
+    Run benchmarks for all sizes, each one in a fresh process, and save results into a json file.
+    """
+    results = {}
+    context = get_context("spawn")
+    for name in names or list(BENCHMARKS):
+        for size in sizes:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_benchmark, name, size, number, repeat).result()
+            key = f"{name}[{size}]"
+            results[key] = result
+            print(f"{key:<36} {result['seconds'] * 1e3:>12.3f} ms {result['peak_bytes'] / 1e6:>10.1f} MB")
+
+    metadata = {
+        "python": sys.version.split()[0],
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "num_threads": torch.get_num_threads(),
+        "cpu_count": os.cpu_count(),
+    }
+    report = {"metadata": metadata, "results": results}
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    return report
+
+
+def compare(baseline: str, current: str, threshold: float = DEFAULT_THRESHOLD) -> None:
+    """
+    Compare the results of two runs, and exit with an error when a duration or a peak memory of the
+    current run exceeds the one of the baseline by more than "threshold" (as a fraction of the baseline).
+    Only benchmarks found in both runs are compared.
+    """
+    with open(baseline) as file:
+        expected = json.load(file)["results"]
+    with open(current) as file:
+        observed = json.load(file)["results"]
+
+    regressions = []
+    print(f"{'benchmark':<36} {'time':>8} {'memory':>8}")
+    for key in [key for key in expected if key in observed]:
+        # peak memories below 1 MB are noise, and compare as 1 MB
+        ratios = {
+            "seconds": observed[key]["seconds"] / expected[key]["seconds"],
+            "peak_bytes": max(observed[key]["peak_bytes"], MIN_PEAK_BYTES)
+            / max(expected[key]["peak_bytes"], MIN_PEAK_BYTES),
+        }
+        flags = [metric for metric, ratio in ratios.items() if ratio > 1 + threshold]
+        print(f"{key:<36} {ratios['seconds']:>7.2f}x {ratios['peak_bytes']:>7.2f}x {' '.join(flags)}")
+        regressions += [(key, metric) for metric in flags]
+
+    if regressions:
+        print(f"{len(regressions)} regressions beyond {threshold:.0%}")
+        sys.exit(1)
+    return
+
+
+if __name__ == "__main__":
+    Fire({"run": run, "compare": compare})
@@ -0,0 +1,15 @@
+import time
+from typing import Callable
+
+
+def measure(func: Callable[[], object], number: int = 10, repeat: int = 5) -> float:
+    """
+    Return the best average duration (in seconds) of a call to a function, over several repeats.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
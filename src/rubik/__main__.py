@@ -1,7 +1,30 @@
+import importlib
+import sys
+
 from fire import Fire
 
-from rubik.interface.app import app
+
+# subcommands import their module when invoked only, so that none of them pays for the imports of the others
+COMMANDS = {
+    "interface": ("rubik.interface.app", "app"),
+    "warmup": ("rubik.cache", "warmup_cache"),
+    "generate": ("rubik.dataset", "generate_dataset"),
+}
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run the subcommand named by the first argument, with the remaining arguments.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(f"Usage: python -m rubik {{{','.join(COMMANDS)}}} [--help | arguments]", file=sys.stderr)
+        sys.exit(0 if argv[:1] in ([], ["--help"], ["-h"]) else 2)
+
+    (module, name) = COMMANDS[argv[0]]
+    Fire(getattr(importlib.import_module(module), name), command=argv[1:], name=f"rubik {argv[0]}")
+    return
 
 
 if __name__ == "__main__":
-    Fire({"interface": app})
+    main()
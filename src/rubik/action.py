@@ -1,9 +1,12 @@
 import re
+from functools import lru_cache
 
 import numpy as np
 import torch
 import torch.nn.functional as F
 
+from rubik.metrics import instrument
+from rubik.permutation import generate_permutation_group
 from rubik.state import build_permutation_matrix, build_cube_tensor
 
 
@@ -55,29 +58,190 @@ POS_SHIFTS = torch.tensor(
 # rotation about X axis: 0 (Up)   -> 2 (Front) -> 5 (Down)  -> 4 (Back)  -> 0 (Up)
 # rotation about Y axis: 0 (Up)   -> 1 (Left)  -> 5 (Down)  -> 3 (Right) -> 0 (Up)
 # rotation about Z axis: 1 (Left) -> 2 (Front) -> 3 (Right) -> 4 (Back)  -> 1 (Left)
-FACE_ROTATIONS = torch.stack(
-    [
-        build_permutation_matrix(size=6, perm="0254"),
-        build_permutation_matrix(size=6, perm="0153"),
-        build_permutation_matrix(size=6, perm="1234"),
-    ]
-)
+FACE_CYCLES = ["0254", "0153", "1234"]
+FACE_PERMUTATIONS = [
+    [2, 1, 5, 3, 0, 4],
+    [1, 5, 2, 0, 4, 3],
+    [0, 2, 3, 4, 1, 5],
+]
+
+
+@lru_cache(maxsize=1)
+def build_face_rotations() -> torch.Tensor:
+    """
+    Build the 3D sparse tensor of shape (3, 6, 6) stacking the permutation matrices of faces of rotations
+    about each axis.
+    """
+    return torch.stack([build_permutation_matrix(size=6, perm=cycle) for cycle in FACE_CYCLES])
 
 
+def __getattr__(name: str):
+    # sparse tensors of face rotations are built on first access rather than at import time
+    if name == "FACE_ROTATIONS":
+        return build_face_rotations()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@instrument
 def build_actions_tensor(size: int) -> torch.Tensor:
     """
     Built the 4D tensor carrying all rotations of a cube as index permutation.
+    All 3 x size x 2 permutations are computed in a single batched pass: every facelet is rotated
+    about each axis at once, and rotated coordinates are mapped back to flat positions through a
+    sorted lookup of coordinate keys.
     """
-    return torch.tensor(
-        [
-            [
-                [build_action_permutation(size=size, axis=axis, slice=slice, inverse=inverse) for inverse in range(2)]
-                for slice in range(size)
-            ]
-            for axis in range(3)
-        ],
-        dtype=torch.int64,
-    )
+    indices = build_cube_tensor(size).indices().to(dtype=torch.int64)  # size = (4, length)
+    length = indices.shape[-1]
+
+    # apply coordinate rotation about each axis to all facelets
+    rotated = POS_ROTATIONS @ indices + (POS_SHIFTS * (size - 1)).unsqueeze(-1)  # size = (3, 4, length)
+
+    # apply face rotation
+    face_perms = torch.tensor(FACE_PERMUTATIONS, dtype=torch.int64)  # size = (3, 6)
+    rotated[:, 0] = face_perms.gather(1, rotated[:, 0])
+
+    # map rotated coordinates to flat positions, sparse indices being sorted in lexicographic order
+    keys = _flatten_coordinates(indices, size)  # size = (length,)
+    destinations = torch.searchsorted(keys, _flatten_coordinates(rotated, size))  # size = (3, length)
+    sources = torch.argsort(destinations, dim=-1)  # size = (3, length)
+
+    # restrict each rotation to the facelets lying in the rotated slice
+    slices = torch.arange(size, dtype=torch.int64).reshape(1, size, 1)
+    changes = (indices[1:].unsqueeze(1) == slices).unsqueeze(2)  # size = (3, size, 1, length)
+    perms = torch.stack([sources, destinations], dim=1).unsqueeze(1)  # size = (3, 1, 2, length)
+    return torch.where(changes, perms, torch.arange(length, dtype=torch.int64))
+
+
+def build_changes_tensor(actions: torch.Tensor) -> torch.Tensor:
+    """
+    Convert a tensor of actions into the (destination, source) pairs of positions changed by each action,
+    stored back to back without padding as a 2D tensor of shape (3, m), m being the total number of changed
+    positions. Rows hold the index (axis * size + slice) * 2 + inverse of the action, the destination and
+    the source of each pair, pairs being sorted by action and then by destination.
+    """
+    identity = torch.arange(actions.shape[-1], dtype=torch.int64)
+    (moves, destinations) = (actions.reshape(-1, actions.shape[-1]) != identity).nonzero().unbind(-1)
+    sources = actions.reshape(-1, actions.shape[-1])[moves, destinations]
+    return torch.stack([moves, destinations, sources.to(dtype=torch.int64)])
+
+
+class SparseChanges:
+    """
+    Read-only table of the (destination, source) pairs of positions changed by each move, as returned by
+    "build_changes_tensor", so that a move only copies the facelets it changes: 4 * size of them for an
+    inner slice, and size**2 more for an outer one. It is indexed by (axis, slice, inverse) coordinates,
+    like the tensor of actions, and returns a pair of views (destinations, sources).
+    """
+
+    def __init__(self, changes: torch.Tensor, size: int):
+        self.changes = changes
+        self.size = size
+        # pairs of the move of index i lie between offsets i and i + 1
+        bounds = torch.arange(6 * size + 1, device=changes.device)
+        self.offsets: list[int] = torch.searchsorted(changes[0], bounds).tolist()
+
+    @classmethod
+    def from_actions(cls, actions: torch.Tensor) -> "SparseChanges":
+        """
+        Create sparse table from a 4D tensor of actions.
+        """
+        return cls(build_changes_tensor(actions), actions.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        return self.changes.nbytes
+
+    def to(self, device: str | torch.device | None = None) -> "SparseChanges":
+        """
+        Move the table to another device.
+        """
+        return SparseChanges(self.changes.to(device=device), self.size)
+
+    def __getitem__(self, index: tuple[int, int, int]) -> tuple[torch.Tensor, torch.Tensor]:
+        """
+        Return the destinations and sources of the positions changed by a move given as (axis, slice, inverse).
+        """
+        (axis, slice, inverse) = index
+        move = (axis * self.size + slice) * 2 + inverse
+        (_, destinations, sources) = self.changes[:, self.offsets[move] : self.offsets[move + 1]]
+        return (destinations, sources)
+
+
+def get_index_dtype(length: int) -> torch.dtype:
+    """
+    Return the narrowest integer dtype able to hold all positions of a state of a given length.
+    """
+    for dtype in (torch.uint8, torch.int16, torch.int32):
+        if length - 1 <= torch.iinfo(dtype).max:
+            return dtype
+    return torch.int64
+
+
+class CompactActions:
+    """
+    Read-only table of actions storing the permutation of each move in direct orientation only,
+    as a 3D tensor of shape (3, size, 6 * size**2) with the narrowest integer dtype fitting positions.
+    It is indexed like the 4D tensor of actions, derives inverse permutations on the fly, and returns
+    int64 permutations.
+    """
+
+    def __init__(self, forward: torch.Tensor):
+        self.forward = forward
+
+    @classmethod
+    def from_actions(cls, actions: torch.Tensor) -> "CompactActions":
+        """
+        Create compact table from a 4D tensor of actions.
+        """
+        return cls(actions[:, :, 0].to(dtype=get_index_dtype(actions.shape[-1])))
+
+    @property
+    def shape(self) -> torch.Size:
+        (axes, size, length) = self.forward.shape
+        return torch.Size([axes, size, 2, length])
+
+    @property
+    def device(self) -> torch.device:
+        return self.forward.device
+
+    @property
+    def nbytes(self) -> int:
+        return self.forward.nbytes
+
+    def to(self, device: str | torch.device | None = None, dtype: torch.dtype | None = None) -> "CompactActions":
+        """
+        Move the table to another device, positions keeping their compact dtype.
+        """
+        return CompactActions(self.forward.to(device=device))
+
+    def __getitem__(self, index: tuple) -> torch.Tensor:
+        """
+        Return the permutations of moves given as (axis, slice, inverse) coordinates,
+        each being either an integer or a tensor of integers.
+        """
+        (axis, slice, inverse) = index
+        forward = self.forward[axis, slice].to(dtype=torch.int64)
+        if isinstance(inverse, int):
+            return self.invert(forward) if inverse else forward
+        inverse = torch.as_tensor(inverse, dtype=torch.bool, device=forward.device).unsqueeze(-1)
+        return torch.where(inverse, self.invert(forward), forward)
+
+    @staticmethod
+    def invert(permutations: torch.Tensor) -> torch.Tensor:
+        """
+        Invert permutations stacked along the last dimension.
+        """
+        identity = torch.arange(permutations.shape[-1], device=permutations.device).expand_as(permutations)
+        return torch.empty_like(permutations).scatter_(-1, permutations, identity)
+
+
+def _flatten_coordinates(coordinates: torch.Tensor, size: int) -> torch.Tensor:
+    """
+    Convert (face, x, y, z) coordinates stacked along the second to last dimension into integer keys
+    preserving their lexicographic order.
+    """
+    face, x, y, z = coordinates.unbind(dim=-2)
+    return ((face * size + x) * size + y) * size + z
 
 
 def build_action_permutation(size: int, axis: int, slice: int, inverse: int) -> list[int]:
@@ -99,7 +263,9 @@ def build_action_permutation(size: int, axis: int, slice: int, inverse: int) ->
     rotated = rotated + offsets  # size = (4, n)
 
     # apply face rotation
-    rotated[0] = (F.one_hot(rotated[0].long(), num_classes=6).to(torch.int64) @ FACE_ROTATIONS[axis]).argmax(dim=-1)
+    rotated[0] = (F.one_hot(rotated[0].long(), num_classes=6).to(torch.int64) @ build_face_rotations()[axis]).argmax(
+        dim=-1
+    )
 
     # from this point on, convert rotation into a position-based permutation of colors
     (inputs, outputs) = (rotated, extract) if bool(inverse) else (extract, rotated)
@@ -115,26 +281,179 @@ def build_action_permutation(size: int, axis: int, slice: int, inverse: int) ->
     return [(i if i not in total_to_local else local_to_total[local_perm[total_to_local[i]]]) for i in range(length)]
 
 
-def parse_action_str(move: str) -> tuple[int, int, int]:
+# batched gathers of a balanced reduction only beat sequential gathers while the fixed cost of a gather
+# outweighs its length, that is for cubes up to size 7 (see benchmarks.bench_compose)
+BALANCED_MAX_LENGTH = 6 * 7**2
+
+MOVES_PATTERN = re.compile(r"([XYZ])(\d+)(\S*)|(\S+)")
+
+
+def parse_action_str(move: str, size: int | None = None) -> tuple[int, int, int]:
     """
     Convert the name of an action into a triple (axis, slice, inverse).
     Examples:
         'X1'  -> (0, 1, 0)
         'X2i' -> (0, 2, 1)
     """
-    axis = "XYZ".index(move[0])
-    slice = int(re.findall(r"^\d+", move[1:])[0])
-    inverse = int(len(move) > (1 + len(str(slice))))
-    return (axis, slice, inverse)
+    actions = parse_actions_str(move, size)
+    if len(actions) != 1:
+        raise ValueError(f"Expected a single move, got '{move}'")
+    return actions[0]
 
 
-def parse_actions_str(moves: str) -> list[tuple[int, int, int]]:
+@instrument
+def parse_actions_str(moves: str, size: int | None = None) -> list[tuple[int, int, int]]:
     """
     Convert a sequence of actions in a string into a list of triples (axis, slice, inverse).
+    When a cube size is supplied, slices are checked to lie within the cube.
     Examples:
         'X1 X2i'  -> [(0, 1, 0), (0, 2, 1)]
     """
-    return [parse_action_str(move) for move in moves.strip().split()]
+    actions = _parse_actions_str(moves)
+    if size is not None:
+        for index, (axis, slice, inverse) in enumerate(actions):
+            if slice >= size:
+                raise ValueError(
+                    f"Move #{index} '{format_action_str((axis, slice, inverse))}' is out of bounds "
+                    f"for a cube of size {size}, whose slices range from 0 to {size - 1}"
+                )
+    return list(actions)
+
+
+@lru_cache(maxsize=1024)
+def _parse_actions_str(moves: str) -> tuple[tuple[int, int, int], ...]:
+    """
+    Convert a sequence of actions in a string into triples (axis, slice, inverse), in a single pass
+    of a compiled regular expression. Results are cached, so that recently seen strings are parsed once.
+    """
+    actions = []
+    for match in MOVES_PATTERN.finditer(moves):
+        (axis, slice, suffix, invalid) = match.groups()
+        if invalid is not None:
+            raise ValueError(f"Invalid move '{invalid}', expected an axis among X, Y, Z followed by a slice, e.g. 'X1'")
+        actions.append(("XYZ".index(axis), int(slice), int(len(suffix) > 0)))
+    return tuple(actions)
+
+
+def parse_actions_tensor(moves: str, size: int | None = None) -> torch.Tensor:
+    """
+    Convert a sequence of actions in a string into a 2D tensor of shape (k, 3) of (axis, slice, inverse).
+    When a cube size is supplied, slices are checked to lie within the cube.
+    """
+    return torch.tensor(parse_actions_str(moves, size), dtype=torch.int64).reshape(-1, 3)
+
+
+def format_action_str(action: tuple[int, int, int]) -> str:
+    """
+    Convert a triple (axis, slice, inverse) into the name of an action.
+    Examples:
+        (0, 1, 0) -> 'X1'
+        (0, 2, 1) -> 'X2i'
+    """
+    (axis, slice, inverse) = action
+    return f"{'XYZ'[axis]}{slice}{'i' * inverse}"
+
+
+def format_actions_str(actions: list[tuple[int, int, int]] | torch.Tensor) -> str:
+    """
+    Convert a sequence of triples (axis, slice, inverse) into a string of actions.
+    """
+    if isinstance(actions, torch.Tensor):
+        actions = [(axis, slice, inverse) for axis, slice, inverse in actions.tolist()]
+    return " ".join(format_action_str(action) for action in actions)
+
+
+def encode_actions(actions: list[tuple[int, int, int]] | torch.Tensor, size: int) -> bytes:
+    """
+    Encode a sequence of triples (axis, slice, inverse) into bytes. Each move is mapped to the integer
+    (axis * size + slice) * 2 + inverse, stored as a single byte for cubes of size up to 42, and as
+    a LEB128 varint (7 bits per byte, high bit flagging continuation) beyond.
+    """
+    actions = torch.as_tensor(actions, dtype=torch.int64).reshape(-1, 3)
+    codes = (actions[:, 0] * size + actions[:, 1]) * 2 + actions[:, 2]
+    if size <= 42:
+        return codes.to(dtype=torch.uint8).numpy().tobytes()
+
+    # split each code into 7-bit groups, keeping groups up to the most significant non-zero one
+    shifts = 7 * torch.arange((6 * size - 1).bit_length() // 7 + 1)
+    remainders = codes.unsqueeze(-1) >> shifts
+    groups = remainders & 0x7F
+    needed = (remainders > 0) | (shifts == 0)
+    continued = torch.cat([needed[:, 1:], torch.zeros_like(needed[:, :1])], dim=-1)
+    return (groups | (continued.to(dtype=torch.int64) << 7))[needed].to(dtype=torch.uint8).numpy().tobytes()
+
+
+def decode_actions(data: bytes, size: int) -> torch.Tensor:
+    """
+    Decode bytes produced by "encode_actions" into a 2D tensor of shape (k, 3) of (axis, slice, inverse).
+    """
+    array = torch.from_numpy(np.frombuffer(data, dtype=np.uint8).astype(np.int64))
+    if size <= 42:
+        codes = array
+    else:
+        # group bytes by code, each code ending with a byte whose high bit is unset
+        ends = (array & 0x80) == 0
+        if len(array) and not ends[-1]:
+            raise ValueError("Truncated encoding of moves, last byte flags a continuation")
+        indices = torch.cumsum(ends.to(dtype=torch.int64), dim=0) - ends.to(dtype=torch.int64)
+        starts = torch.cat([torch.ones_like(ends[:1]), ends[:-1]]).nonzero().reshape(-1)
+        shifts = 7 * (torch.arange(len(array)) - starts[indices])
+        codes = torch.zeros(int(ends.sum()), dtype=torch.int64).scatter_add_(0, indices, (array & 0x7F) << shifts)
+    return torch.stack([codes // 2 // size, codes // 2 % size, codes % 2], dim=-1)
+
+
+def canonicalize_actions(actions: list[tuple[int, int, int]]) -> list[tuple[int, int, int]]:
+    """
+    Reduce a sequence of triples (axis, slice, inverse) to a normal form having the same effect.
+    Consecutive moves along the same axis commute, so that they are merged into the net number of quarter
+    turns of each slice modulo 4, emitted by increasing slice: a single move for 1 turn, twice the direct move
+    for 2 turns, and the inverse move for 3 turns. Runs cancelling out entirely let surrounding runs merge.
+    Examples:
+        'X1 X0 X1 Y0 Y0i X1' -> 'X0 X1i'
+        'X0 X0 X0 X0'        -> ''
+    """
+    # stack of runs of moves along the same axis, each holding the net number of turns of its slices
+    runs: list[tuple[int, dict[int, int]]] = []
+    for axis, slice, inverse in actions:
+        if not runs or runs[-1][0] != axis:
+            runs.append((axis, {}))
+        turns = runs[-1][1]
+        turns[slice] = (turns.get(slice, 0) + (3 if inverse else 1)) % 4
+        if turns[slice] == 0:
+            del turns[slice]
+        if not turns:
+            runs.pop()
+    return [
+        (axis, slice, int(turns[slice] == 3))
+        for axis, turns in runs
+        for slice in sorted(turns)
+        for _ in range(2 if turns[slice] == 2 else 1)
+    ]
+
+
+def build_successor_table(size: int) -> torch.Tensor:
+    """
+    Build the transition table of an automaton accepting exactly the sequences of moves in normal form,
+    as returned by "canonicalize_actions", so that searches only generate such sequences.
+    Moves are indexed as (axis * size + slice) * 2 + inverse, and states are 0 for the empty sequence,
+    1 + m after a single move m, and 1 + 6 * size + m after move m twice in a row. The output is a 2D tensor
+    of shape (1 + 12 * size, 6 * size) holding the state reached by appending a move, or -1 when the resulting
+    sequence is not in normal form.
+    """
+    num_moves = 6 * size
+    moves = torch.arange(num_moves)
+    (axes, slices, inverses) = torch.cartesian_prod(torch.arange(3), torch.arange(size), torch.arange(2)).unbind(-1)
+
+    # whether a move (column) may follow another move (row), either along another axis or a higher slice,
+    # or as the same direct move
+    follows = (axes.unsqueeze(-1) != axes) | (slices.unsqueeze(-1) < slices)
+    repeats = (moves.unsqueeze(-1) == moves) & (inverses == 0)
+
+    table = torch.full((1 + 2 * num_moves, num_moves), -1, dtype=torch.int64)
+    table[0] = 1 + moves
+    table[1 : 1 + num_moves] = torch.where(follows, 1 + moves, torch.where(repeats, 1 + num_moves + moves, -1))
+    table[1 + num_moves :] = torch.where(follows, 1 + moves, -1)
+    return table
 
 
 def sample_actions_str(num_moves: int, size: int, seed: int = 0) -> str:
@@ -146,3 +465,64 @@ def sample_actions_str(num_moves: int, size: int, seed: int = 0) -> str:
     slices = rng.choice([str(i) for i in range(size)], size=num_moves)
     orients = rng.choice(["", "i"], size=num_moves)
     return " ".join("".join(move) for move in zip(axes, slices, orients))
+
+
+def sample_actions(num_moves: int, size: int, seed: int = 0) -> torch.Tensor:
+    """
+    Randomly sample moves as a 2D tensor of shape (num_moves, 3) of (axis, slice, inverse) coordinates.
+    For a given seed, moves are identical to the ones generated by "sample_actions_str".
+    """
+    rng = np.random.default_rng(seed=seed)
+    axes = rng.choice(3, size=num_moves)
+    slices = rng.choice(size, size=num_moves)
+    inverses = rng.choice(2, size=num_moves)
+    return torch.from_numpy(np.stack([axes, slices, inverses], axis=-1)).to(dtype=torch.int64)
+
+
+def compose_actions(
+    actions: torch.Tensor | CompactActions,
+    moves: torch.Tensor,
+    max_numel: int = 2**24,
+    max_length: int = BALANCED_MAX_LENGTH,
+) -> torch.Tensor:
+    """
+    Combine a sequence of moves, given as a 2D tensor of shape (k, 3) of coordinates, into a single permutation.
+    For states of at most "max_length" positions, moves are processed by chunks holding at most "max_numel"
+    positions, each chunk being reduced with a balanced pairwise reduction of batched gathers. Longer states
+    gather the permutations of moves one after the other, as batched gathers do as much work plus copies.
+    """
+    length = actions.shape[-1]
+    permutation = torch.arange(length, dtype=torch.int64, device=actions.device)
+    if length > max_length:
+        for axis, slice, inverse in moves.tolist():
+            permutation = permutation[actions[axis, slice, inverse]]
+        return permutation
+
+    chunk_size = max(1, max_numel // length)
+    for chunk in moves.split(chunk_size):
+        permutations = actions[chunk[:, 0], chunk[:, 1], chunk[:, 2]]  # size = (chunk_size, length)
+        permutation = permutation[reduce_permutations(permutations)]
+    return permutation
+
+
+def reduce_permutations(permutations: torch.Tensor) -> torch.Tensor:
+    """
+    Combine permutations stacked along the first dimension into a single one, with a balanced pairwise
+    reduction taking a logarithmic number of batched gathers.
+    """
+    if permutations.shape[0] == 0:
+        return torch.arange(permutations.shape[-1], dtype=torch.int64, device=permutations.device)
+    while permutations.shape[0] > 1:
+        (paired, remainder) = permutations.split([permutations.shape[0] // 2 * 2, permutations.shape[0] % 2])
+        reduced = torch.gather(paired[0::2], 1, paired[1::2])
+        permutations = torch.cat([reduced, remainder])
+    return permutations[0]
+
+
+def build_rotations_tensor(actions: torch.Tensor) -> torch.Tensor:
+    """
+    Build the 24 permutations of whole-cube rotations, as a 2D tensor of shape (24, 6 * size**2), the first one
+    being identity. A quarter turn of the whole cube about an axis combines the moves of all its slices,
+    and all rotations are generated by the quarter turns about the 3 axes.
+    """
+    return generate_permutation_group([reduce_permutations(actions[axis, :, 0]) for axis in range(3)])
@@ -0,0 +1,64 @@
+import torch
+
+from rubik.action import build_actions_tensor, parse_actions_str
+from rubik.cache import load_actions_tensor
+from rubik.state import build_cube_tensor
+
+
+class CubeBatch:
+    """
+    A batch of cubes of the same size, whose states are stacked into a 2D tensor of shape (N, 6 * size**2).
+    Cubes share a single tensor of actions, and each cube can undergo a different move at each step,
+    so that all cubes are rotated at once by a batched gather.
+    """
+
+    def __init__(self, size: int, num_cubes: int, cache: bool = True):
+        """
+        Create a batch of cubes of a given size, all in solved state.
+        """
+        tensor = build_cube_tensor(size)
+
+        self.dtype = torch.int64
+        self.coordinates = tensor.indices()
+        self.states = tensor.values().repeat(num_cubes, 1)
+        self.actions = load_actions_tensor(size) if cache else build_actions_tensor(size)
+        # internal-only attributes
+        self._size: int = size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return self.states.shape[0]
+
+    def rotate(self, moves: str | list[str]) -> None:
+        """
+        Apply sequences of moves (defined as plain strings) to the cubes, either a single sequence applied
+        to all cubes, or one sequence per cube, all sequences having the same number of moves.
+        """
+        if isinstance(moves, str):
+            for action in parse_actions_str(moves, self.size):
+                self.states = self.states[:, self.actions[action]]
+            return
+
+        assert len(moves) == len(self), f"Expected {len(self)} sequences of moves, got {len(moves)}"
+        actions = torch.tensor([parse_actions_str(m, self.size) for m in moves], dtype=torch.int64)  # size = (N, k, 3)
+        self.rotate_many(actions)
+        return
+
+    def rotate_many(self, actions: torch.Tensor) -> None:
+        """
+        Apply sequences of moves (defined as a 3D tensor of shape (N, k, 3) of coordinates) to the cubes.
+        """
+        for step in actions.unbind(dim=1):
+            self.rotate_once(*step.unbind(dim=-1))
+        return
+
+    def rotate_once(self, axes: torch.Tensor, slices: torch.Tensor, inverses: torch.Tensor) -> None:
+        """
+        Apply one move per cube, moves being defined by 3 1D tensors of coordinates of length N.
+        """
+        actions = self.actions[axes, slices, inverses]  # size = (N, 6 * size**2)
+        self.states = torch.gather(self.states, 1, actions)
+        return
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import warnings
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import torch
+from loguru import logger
+
+from rubik.action import CompactActions, SparseChanges, build_actions_tensor, build_changes_tensor
+
+
+CACHE_VERSION = 3
+CACHE_DIR_ENV = "RUBIK_CACHE_DIR"
+
+TABLE_BUILDERS: dict[str, Callable[[int], torch.Tensor]] = {
+    "actions": build_actions_tensor,
+    "changes": lambda size: build_changes_tensor(build_actions_tensor(size)),
+    "compact": lambda size: CompactActions.from_actions(build_actions_tensor(size)).forward,
+}
+
+
+def get_cache_dir(cache_dir: str | Path | None = None) -> Path:
+    """
+    Resolve the directory holding cached tables: the supplied one if any, otherwise the one set by
+    the RUBIK_CACHE_DIR environment variable, otherwise the user cache directory.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get(CACHE_DIR_ENV) or (Path.home() / ".cache" / "rubik-tensor")
+    return Path(cache_dir)
+
+
+def get_table_path(name: str, size: int, cache_dir: str | Path | None = None) -> Path:
+    """
+    Path of the file storing a table of a cube of a given size.
+    """
+    return get_cache_dir(cache_dir) / f"v{CACHE_VERSION}" / f"{name}-{size}.npy"
+
+
+def compute_checksum(array: np.ndarray) -> str:
+    """
+    Compute the sha256 digest of an array content, salted with the cache format version.
+    """
+    digest = hashlib.sha256(f"rubik-tensor-v{CACHE_VERSION}".encode())
+    digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+def save_table(
+    name: str, size: int, cache_dir: str | Path | None = None, builder: Callable[[int], torch.Tensor] | None = None
+) -> Path:
+    """
+    Build a table of a cube of a given size and store it in the cache directory,
+    along with a json file holding its format version and checksum.
+    The table is built by the supplied builder if any, otherwise by the one registered under its name.
+    """
+    path = get_table_path(name, size, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    array = (builder or TABLE_BUILDERS[name])(size).numpy()
+    metadata = {
+        "version": CACHE_VERSION,
+        "name": name,
+        "size": size,
+        "shape": list(array.shape),
+        "dtype": str(array.dtype),
+        "sha256": compute_checksum(array),
+    }
+
+    # write temporary files first and move them in place, so that concurrent processes never read partial files
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as file:
+        np.save(file, array)
+    os.replace(tmp_path, path)
+
+    tmp_path = path.with_name(f"{path.stem}.json.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(metadata))
+    os.replace(tmp_path, path.with_suffix(".json"))
+    logger.info(f"Cached {name} table of size {size} at '{path}'")
+    return path
+
+
+def read_table(
+    name: str,
+    size: int,
+    cache_dir: str | Path | None = None,
+    validate: bool = True,
+    builder: Callable[[int], torch.Tensor] | None = None,
+) -> torch.Tensor:
+    """
+    Load a table of a cube of a given size as a read-only memory-mapped tensor.
+    The table is built and cached first if missing, outdated or corrupted.
+    """
+    path = get_table_path(name, size, cache_dir)
+    metadata_path = path.with_suffix(".json")
+    if not (path.exists() and metadata_path.exists()):
+        save_table(name, size, cache_dir, builder)
+
+    array = np.load(path, mmap_mode="r")
+    metadata = json.loads(metadata_path.read_text())
+    if metadata.get("version") != CACHE_VERSION or (validate and metadata.get("sha256") != compute_checksum(array)):
+        logger.warning(f"Cached {name} table at '{path}' is invalid, rebuilding it")
+        save_table(name, size, cache_dir, builder)
+        array = np.load(path, mmap_mode="r")
+
+    # the underlying memory map is read-only, which torch warns about
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.from_numpy(array)
+
+
+def load_table(name: str, size: int, cache_dir: str | Path | None = None, validate: bool = True) -> torch.Tensor:
+    """
+    Load a table of a cube of a given size, keeping the most recently used ones in memory
+    so that all cubes of a given size share a single copy. Tables are kept by resolved cache directory,
+    so that changes of the RUBIK_CACHE_DIR environment variable are honored.
+    """
+    return _load_table(name, size, get_cache_dir(cache_dir), validate)
+
+
+@lru_cache(maxsize=16)
+def _load_table(name: str, size: int, cache_dir: Path, validate: bool) -> torch.Tensor:
+    """
+    Same as "load_table", given a resolved cache directory.
+    """
+    return read_table(name, size, cache_dir, validate)
+
+
+def load_actions_tensor(size: int, cache_dir: str | Path | None = None) -> torch.Tensor:
+    """
+    Load the actions tensor of a cube of a given size, as returned by "build_actions_tensor".
+    """
+    return load_table("actions", size, cache_dir)
+
+
+def load_compact_actions(size: int, cache_dir: str | Path | None = None) -> CompactActions:
+    """
+    Load the compact table of actions of a cube of a given size.
+    """
+    return CompactActions(load_table("compact", size, cache_dir))
+
+
+def load_changes_tensor(size: int, cache_dir: str | Path | None = None) -> torch.Tensor:
+    """
+    Load the changes tensor of a cube of a given size, as returned by "build_changes_tensor".
+    """
+    return load_table("changes", size, cache_dir)
+
+
+def load_sparse_changes(size: int, cache_dir: str | Path | None = None) -> SparseChanges:
+    """
+    Load the sparse table of changes of a cube of a given size.
+    """
+    return SparseChanges(load_table("changes", size, cache_dir), size)
+
+
+def warmup_cache(min_size: int = 2, max_size: int = 10, cache_dir: str | None = None) -> None:
+    """
+    Build and store the tables of all cube sizes within the supplied range (bounds included).
+    """
+    for size in range(min_size, max_size + 1):
+        for name in TABLE_BUILDERS:
+            read_table(name, size, cache_dir)
+    return
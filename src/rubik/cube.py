@@ -1,10 +1,31 @@
-from functools import reduce
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO
+
 from loguru import logger
 
+import numpy as np
 import torch
 
-from rubik.action import build_actions_tensor, parse_actions_str, sample_actions_str
-from rubik.state import build_cube_tensor
+from rubik.action import (
+    CompactActions,
+    SparseChanges,
+    build_actions_tensor,
+    canonicalize_actions,
+    compose_actions,
+    parse_actions_str,
+    sample_actions,
+)
+from rubik.cache import load_actions_tensor, load_compact_actions, load_sparse_changes
+from rubik.metrics import instrument
+from rubik.permutation import permutation_order, permutation_power
+from rubik.state import build_cube_tensor, build_face_index, pack_state, unpack_state
+
+
+MACRO_NAME_PATTERN = re.compile(r"^(?![XYZ]\d)[^\s()^]+$")
+REPEAT_PATTERN = re.compile(r"\(([^()]*)\)\s*\^\s*(-?\d+)")
 
 
 class Cube:
@@ -19,17 +40,30 @@ class Cube:
     the rest according to order given in "colors" attribute.
     """
 
-    def __init__(self, size: int):
+    def __init__(self, size: int, cache: bool = True, compact: bool = False):
         """
         Create Cube of a given size.
+        When "cache" is enabled, the actions and changes tensors are loaded from the on-disk cache and
+        shared with all other cubes of the same size, otherwise they are built from scratch.
+        When "compact" is enabled, actions are stored as a CompactActions table.
         """
         tensor = build_cube_tensor(size)
 
         self.dtype = torch.int64
         self.coordinates = tensor.indices()
-        self.state = tensor.values()
-        self.actions = build_actions_tensor(size)
+        self.state = tensor.values().clone()
+        self.actions: torch.Tensor | CompactActions
+        if cache:
+            self.actions = load_compact_actions(size) if compact else load_actions_tensor(size)
+            self.changes = load_sparse_changes(size)
+        else:
+            actions = build_actions_tensor(size)
+            self.actions = CompactActions.from_actions(actions) if compact else actions
+            self.changes = SparseChanges.from_actions(actions)
         # internal-only attributes
+        self._compositions: OrderedDict[str, torch.Tensor] = OrderedDict()
+        self._compositions_numel: int = 2**22
+        self._macros: dict[str, list[tuple[int, int, int]]] = {}
         self._history: list[tuple[int, int, int]] = []
         self._colors: list[str] = list("ULCRBD")
         self._size: int = size
@@ -38,6 +72,10 @@ class Cube:
     def history(self) -> list[tuple[int, int, int]]:
         return self._history
 
+    @property
+    def macros(self) -> dict[str, list[tuple[int, int, int]]]:
+        return self._macros
+
     @property
     def colors(self) -> list[str]:
         return self._colors
@@ -52,32 +90,59 @@ class Cube:
         Return the list of faces of the cube, each given by a list of rows,
         each given by a list of facelets.
         """
-        tensor = torch.sparse_coo_tensor(
-            indices=self.coordinates,
-            values=self.state,
-            size=(6, self.size, self.size, self.size),
-            dtype=self.dtype,
-        ).to_dense()
-
-        n = self.size - 1
-        faces = [
-            tensor[0, :, :, n].transpose(0, 1),  # up
-            tensor[1, 0, :, :].flip(1).transpose(0, 1),  # left
-            tensor[2, :, n, :].flip(1).transpose(0, 1),  # front
-            tensor[3, n, :, :].flip(0).flip(1).transpose(0, 1),  # right
-            tensor[4, :, 0, :].flip(0).flip(1).transpose(0, 1),  # back
-            tensor[5, :, :, 0].flip(1).transpose(0, 1),  # down
-        ]
-        return [[[self.colors[i - 1] for i in row] for row in face.tolist()] for face in faces]
+        return self.get_face_bytes().view("S1").astype("U1").tolist()
+
+    def get_face_bytes(self) -> np.ndarray:
+        """
+        Return a 3D array of shape (6, size, size) holding the colors of the facelets of each face, row
+        by row, as ascii codes of their names. Faces are gathered from the state through a face index map,
+        and colors are mapped through a lookup table of bytes.
+        """
+        lookup = np.frombuffer("".join(self.colors).encode("ascii"), dtype=np.uint8)
+        state = self.state.to(device="cpu", dtype=torch.int64)
+        return lookup[(state[build_face_index(self.size)] - 1).numpy()]
 
     def to(self, device: str | torch.device) -> "Cube":
         device = torch.device(device)
         dtype = self.dtype if device == torch.device("cpu") else torch.float32
         self.state = self.state.to(device=device, dtype=dtype)
         self.actions = self.actions.to(device=device, dtype=dtype)
+        self.changes = self.changes.to(device=device)
+        self._compositions.clear()
         logger.info(f"Using device '{self.state.device}' and dtype '{dtype}'")
         return self
 
+    @instrument
+    def save(self, file: str | Path | BinaryIO) -> None:
+        """
+        Store the cube into an npz file, holding its size, its state packed 3 bits per facelet, its history
+        as a 2D array of shape (k, 3) of int8 coordinates (int16 beyond size 128), and its macros as json.
+        Tables of actions are not stored, since they are shared by all cubes of a given size.
+        """
+        dtype = np.int8 if self.size <= 128 else np.int16
+        np.savez(
+            file,
+            size=np.array(self.size),
+            state=pack_state(self.state.to(device="cpu")).numpy(),
+            history=np.array(self._history, dtype=dtype).reshape(-1, 3),
+            macros=np.array(json.dumps(self._macros)),
+        )
+        return
+
+    @classmethod
+    @instrument
+    def load(cls, file: str | Path | BinaryIO, cache: bool = True, compact: bool = False) -> "Cube":
+        """
+        Create a cube from a file written by "save", loading its tables of actions from the cache by size.
+        """
+        with np.load(file) as data:
+            cube = cls(int(data["size"]), cache=cache, compact=compact)
+            cube.state = unpack_state(torch.from_numpy(data["state"]), len(cube.state)).to(dtype=cube.dtype)
+            cube._history = [(axis, slice, inverse) for axis, slice, inverse in data["history"].tolist()]
+            macros = json.loads(str(data["macros"]))
+        cube._macros = {name: [tuple(action) for action in actions] for name, actions in macros.items()}
+        return cube
+
     def reset_history(self) -> None:
         """
         Reset internal history of moves.
@@ -85,48 +150,169 @@ class Cube:
         self._history = []
         return
 
-    def scramble(self, num_moves: int, seed: int = 0) -> None:
+    def scramble(self, num_moves: int, seed: int = 0, keep_history: bool = False) -> None:
+        """
+        Randomly shuffle the cube by the supplied number of steps, and reset history of moves,
+        unless "keep_history" is enabled, in which case sampled moves are appended to history.
+        Sampled moves are combined into a single permutation by "compose_actions", applied at once.
+        """
+        actions = sample_actions(num_moves, self.size, seed=seed)
+        self.state = torch.gather(self.state, 0, compose_actions(self.actions, actions))
+        if keep_history:
+            self._history.extend((axis, slice, inverse) for axis, slice, inverse in actions.tolist())
+        else:
+            self.reset_history()
+        return
+
+    def register_macro(self, name: str, moves: str) -> None:
         """
-        Randomly shuffle the cube by the supplied number of steps, and reset history of moves.
+        Register a named sequence of moves, that can then be used in place of moves in "rotate" and
+        "compose_moves". The sequence may refer to previously registered macros.
+        Example:
+            cube.register_macro("sexy", "X2 Y0 X2i Y0i")
+            cube.rotate("sexy sexy Z0")
         """
-        moves = sample_actions_str(num_moves, self.size, seed=seed)
-        self.rotate(moves)
-        self.reset_history()
+        if not MACRO_NAME_PATTERN.match(name):
+            raise ValueError(
+                f"Invalid macro name '{name}': it must not be a move nor contain spaces, parentheses or '^'"
+            )
+        self._macros[name] = self.parse_moves(moves)
+        self._compositions.clear()
         return
 
-    def rotate(self, moves: str) -> None:
+    def parse_moves(self, moves: str) -> list[tuple[int, int, int]]:
+        """
+        Convert a sequence of moves, registered macros and repeated groups such as "(X0 Y1)^1000"
+        into a list of triples (axis, slice, inverse). Repeated groups are expanded the least number
+        of times having the same effect.
+        """
+        actions = []
+        parts = REPEAT_PATTERN.split(moves)
+        for i in range(0, len(parts), 3):
+            for segment in self._split_macros(parts[i]):
+                actions += self._macros[segment] if segment in self._macros else parse_actions_str(segment, self.size)
+            if i + 2 < len(parts):
+                (group, exponent) = (parts[i + 1], int(parts[i + 2]))
+                actions += self.parse_moves(group) * (exponent % permutation_order(self._compose_moves(group)))
+        return actions
+
+    def _split_macros(self, moves: str) -> list[str]:
+        """
+        Split a sequence of moves and registered macros, without repeated groups, into macros and runs of
+        plain moves between them, so that each run is parsed at once.
+        """
+        if not self._macros:
+            return [moves] if moves.strip() else []
+        segments: list[str] = []
+        run: list[str] = []
+        for token in moves.split():
+            if token not in self._macros:
+                run.append(token)
+                continue
+            if run:
+                segments.append(" ".join(run))
+            segments.append(token)
+            run = []
+        return segments + [" ".join(run)] if run else segments
+
+    def rotate(self, moves: str, canonicalize: bool = False) -> None:
         """
-        Apply a sequence of moves (defined as plain string) to the cube.
+        Apply a sequence of moves, registered macros and repeated groups such as "(X0 Y1)^1000"
+        (defined as plain string) to the cube.
+        Each macro is applied at once through its cached composed permutation, and each repeated group
+        through the power of its composed permutation.
+        When "canonicalize" is enabled, the whole sequence is first reduced to its normal form, so that
+        moves cancelling out are never applied, and only moves of the normal form are appended to history.
         """
-        actions = parse_actions_str(moves)
-        for action in actions:
-            self.rotate_once(*action)
+        if canonicalize:
+            for action in canonicalize_actions(self.parse_moves(moves)):
+                self.rotate_once(*action)
+            return
+
+        parts = REPEAT_PATTERN.split(moves)
+        for i in range(0, len(parts), 3):
+            for segment in self._split_macros(parts[i]):
+                if segment in self._macros:
+                    self.state = torch.gather(self.state, 0, self._compose_moves(segment))
+                    self._history += self._macros[segment]
+                else:
+                    for action in parse_actions_str(segment, self.size):
+                        self.rotate_once(*action)
+            if i + 2 < len(parts):
+                (group, exponent) = (parts[i + 1], int(parts[i + 2]))
+                changes = self._compose_moves(group)
+                repeats = exponent % permutation_order(changes)
+                self.state = torch.gather(self.state, 0, permutation_power(changes, repeats))
+                self._history += self.parse_moves(group) * repeats
         return
 
-    def rotate_once(self, axis: int, slice: int, inverse: int) -> None:
+    @instrument
+    def rotate_once(self, axis: int, slice: int, inverse: int, sparse: bool = False) -> None:
         """
         Apply a move (defined as 3 coordinates) to the cube.
+        The state is gathered through the permutation of the move, unless "sparse" is enabled, in which case
+        it is updated in-place, only copying the facelets changed by the move.
         """
-        action = self.actions[axis, slice, inverse]
-        self.state = torch.gather(self.state, 0, action)
+        if sparse:
+            (destinations, sources) = self.changes[axis, slice, inverse]
+            self.state[destinations] = self.state[sources]
+        else:
+            self.state = torch.gather(self.state, 0, self.actions[axis, slice, inverse])
         self._history.append((axis, slice, inverse))
         return
 
+    @instrument
     def compose_moves(self, moves: str) -> torch.Tensor:
         """
         combine a sequence of moves and return the resulting changes.
+        Results are kept in a LRU cache, and a sequence starting with a cached one only combines
+        the remaining moves. The returned tensor is a copy, that callers are free to modify.
+        """
+        return self._compose_moves(moves).clone()
+
+    def _compose_moves(self, moves: str) -> torch.Tensor:
         """
-        actions = parse_actions_str(moves)
-        tensors = [self.actions[*action] for action in actions]
-        return reduce(lambda A, B: torch.gather(A, 0, B), tensors)
+        Same as "compose_moves", but returning the tensor held by the cache, which must not be modified.
+        """
+        moves = " ".join(moves.split())
+        if moves in self._compositions:
+            self._compositions.move_to_end(moves)
+            return self._compositions[moves]
+
+        parts = REPEAT_PATTERN.split(moves)
+        if len(parts) > 1:
+            # combine plain sequences and powers of repeated groups
+            changes = torch.arange(self.actions.shape[-1], device=self.actions.device)
+            for i in range(0, len(parts), 3):
+                changes = changes[self._compose_moves(parts[i])]
+                if i + 2 < len(parts):
+                    changes = changes[permutation_power(self._compose_moves(parts[i + 1]), int(parts[i + 2]))]
+        else:
+            # start from the longest cached prefix of the sequence, if any
+            prefix = max((key for key in self._compositions if moves.startswith(key + " ")), key=len, default="")
+            actions = torch.tensor(self.parse_moves(moves[len(prefix) :]), dtype=torch.int64).reshape(-1, 3)
+            changes = compose_actions(self.actions, actions)
+            if prefix:
+                changes = self._compositions[prefix][changes]
+
+        # store result, evicting least recently used ones beyond the cache capacity
+        self._compositions[moves] = changes
+        while sum(t.numel() for t in self._compositions.values()) > self._compositions_numel:
+            self._compositions.popitem(last=False)
+        return changes
 
     def __str__(self):
         """
         Compute a string representation of a cube.
         """
-        space = " " * self.size
-        facelets = self.facelets
-        l1 = "\n".join(" ".join([space, "".join(row), space, space]) for row in facelets[0])
-        l2 = "\n".join(" ".join("".join(face[i]) for face in facelets[1:5]) for i in range(self.size))
-        l3 = "\n".join(" ".join((space, "".join(row), space, space)) for row in facelets[-1])
-        return "\n".join([l1, l2, l3])
+        n = self.size
+        faces = self.get_face_bytes()
+
+        # fill a grid of characters with the net of the cube, each row ending with a line break
+        grid = np.full((3 * n, 4 * n + 4), ord(" "), dtype=np.uint8)
+        grid[:, -1] = ord("\n")
+        grid[:n, n + 1 : 2 * n + 1] = faces[0]
+        for i, face in enumerate(faces[1:5]):
+            grid[n : 2 * n, i * (n + 1) : i * (n + 1) + n] = face
+        grid[2 * n :, n + 1 : 2 * n + 1] = faces[5]
+        return grid.tobytes()[:-1].decode("ascii")
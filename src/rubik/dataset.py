@@ -0,0 +1,191 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import torch
+from loguru import logger
+
+from rubik.action import build_actions_tensor
+from rubik.cache import load_actions_tensor
+from rubik.state import build_cube_tensor, pack_state, unpack_state
+
+
+class RandomWalkDataset(torch.utils.data.IterableDataset):
+    """
+    A stream of random walks of cubes of a given size, starting from the initial state.
+    Walks of a batch of cubes run in parallel, each step applying one random move per cube with a single
+    batched gather, and yield a tuple (states, depths, moves) of tensors of shape (N, 6 * size**2), (N,)
+    and (N,), moves being indexed by (axis * size + slice) * 2 + inverse. A move never undoes the previous one.
+    Each worker of a data loader draws its own walks, seeded by the dataset seed and its worker id.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        num_cubes: int = 1024,
+        max_depth: int = 20,
+        num_walks: int | None = None,
+        seed: int = 0,
+        cache: bool = True,
+    ):
+        """
+        Create a stream of "num_walks" walks of "max_depth" moves per worker for batches of "num_cubes" cubes,
+        the stream being endless when "num_walks" is None. Seeds of distinct datasets should differ.
+        """
+        self.size = size
+        self.num_cubes = num_cubes
+        self.max_depth = max_depth
+        self.num_walks = num_walks
+        self.seed = seed
+        self.actions = (load_actions_tensor(size) if cache else build_actions_tensor(size)).reshape(-1, 6 * size**2)
+        self.initial = build_cube_tensor(size).values().to(dtype=torch.uint8)
+
+    def __iter__(self) -> Iterator[tuple[torch.Tensor, torch.Tensor, torch.Tensor]]:
+        info = torch.utils.data.get_worker_info()
+        return self.walk(0 if info is None else info.id)
+
+    def walk(self, worker_id: int = 0) -> Iterator[tuple[torch.Tensor, torch.Tensor, torch.Tensor]]:
+        """
+        Yield the steps of the walks of a given worker.
+        """
+        generator = torch.Generator().manual_seed(self.seed * 2**16 + worker_id)
+        num_moves = len(self.actions)
+        walk = 0
+        while self.num_walks is None or walk < self.num_walks:
+            states = self.initial.repeat(self.num_cubes, 1)
+            moves = torch.randint(num_moves, (self.num_cubes,), generator=generator)
+            for depth in range(1, self.max_depth + 1):
+                states = torch.gather(states, 1, self.actions[moves])
+                yield (states, torch.full((self.num_cubes,), depth, dtype=torch.int64), moves)
+
+                # sample among all moves but the inverse of the last one, which is next to it
+                samples = torch.randint(num_moves - 1, (self.num_cubes,), generator=generator)
+                moves = samples + (samples >= (moves ^ 1)).to(dtype=torch.int64)
+            walk += 1
+
+
+class ShardWriter:
+    """
+    Write batches of states into a directory, as a sequence of shards of at most "shard_size" states each,
+    so that datasets larger than memory are written as they are generated. A shard is an uncompressed npz file
+    holding states packed 3 bits per facelet, along with depths and moves as uint16.
+    """
+
+    def __init__(self, directory: str | Path, shard_size: int = 2**20, prefix: str = "shard"):
+        """
+        Create a writer of shards named "{prefix}-{index}.npz" in a directory, created if missing.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.paths: list[Path] = []
+        self._buffers: list[tuple[torch.Tensor, torch.Tensor, torch.Tensor]] = []
+        self._num_buffered = 0
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        return
+
+    def write(self, states: torch.Tensor, depths: torch.Tensor, moves: torch.Tensor) -> None:
+        """
+        Buffer a batch of states, writing full shards as soon as enough states are buffered.
+        """
+        self._buffers.append((pack_state(states), depths.to(dtype=torch.int32), moves.to(dtype=torch.int32)))
+        self._num_buffered += len(states)
+        while self._num_buffered >= self.shard_size:
+            self.flush(self.shard_size)
+        return
+
+    def flush(self, num_states: int | None = None) -> None:
+        """
+        Write the first "num_states" buffered states into a new shard, all of them if not supplied.
+        Nothing is written when no state is buffered.
+        """
+        if not self._num_buffered:
+            return
+        (states, depths, moves) = (torch.cat(tensors) for tensors in zip(*self._buffers))
+        num_states = len(states) if num_states is None else num_states
+        path = self.directory / f"{self.prefix}-{len(self.paths):05d}.npz"
+
+        # write a temporary file first and move it in place, so that readers never find partial shards
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as file:
+            np.savez(
+                file,
+                states=states[:num_states].numpy(),
+                depths=depths[:num_states].numpy().astype(np.uint16),
+                moves=moves[:num_states].numpy().astype(np.uint16),
+            )
+        os.replace(tmp_path, path)
+        self.paths.append(path)
+
+        rest = (states[num_states:], depths[num_states:], moves[num_states:])
+        (self._buffers, self._num_buffered) = ([rest], len(rest[0]))
+        return
+
+    def close(self) -> None:
+        """
+        Write the remaining buffered states into a last shard.
+        """
+        if self._num_buffered:
+            self.flush()
+        return
+
+
+def read_shards(directory: str | Path, size: int) -> Iterator[tuple[torch.Tensor, torch.Tensor, torch.Tensor]]:
+    """
+    Read the shards of a directory one at a time, yielding a tuple (states, depths, moves) of int64 tensors per shard.
+    """
+    for path in sorted(Path(directory).glob("*.npz")):
+        with np.load(path) as shard:
+            states = unpack_state(torch.from_numpy(shard["states"]), 6 * size**2)
+            yield (
+                states,
+                torch.from_numpy(shard["depths"].astype(np.int64)),
+                torch.from_numpy(shard["moves"].astype(np.int64)),
+            )
+
+
+def _write_worker_shards(
+    directory: str, size: int, num_walks: int, num_cubes: int, max_depth: int, seed: int, shard_size: int, worker: int
+) -> list[Path]:
+    """
+    Write the shards of the walks of a single worker of "generate_dataset".
+    """
+    dataset = RandomWalkDataset(size, num_cubes, max_depth, num_walks, seed)
+    with ShardWriter(directory, shard_size, prefix=f"shard-{worker:03d}") as writer:
+        for states, depths, moves in dataset.walk(worker):
+            writer.write(states, depths, moves)
+    return writer.paths
+
+
+def generate_dataset(
+    directory: str,
+    size: int,
+    num_walks: int = 100,
+    num_cubes: int = 1024,
+    max_depth: int = 20,
+    seed: int = 0,
+    shard_size: int = 2**20,
+    num_workers: int = 1,
+) -> None:
+    """
+    Write random walks of cubes of a given size into shards of a directory, spreading walks over a pool of
+    "num_workers" processes, each running "num_walks" walks of "num_cubes" cubes and writing its own shards.
+    Walks are identical to those of a RandomWalkDataset read by a data loader with as many workers.
+    """
+    write_shards = partial(_write_worker_shards, directory, size, num_walks, num_cubes, max_depth, seed, shard_size)
+    if num_workers == 1:
+        paths = write_shards(0)
+    else:
+        with ProcessPoolExecutor(num_workers) as executor:
+            paths = [path for worker_paths in executor.map(write_shards, range(num_workers)) for path in worker_paths]
+    logger.info(f"Wrote {num_workers * num_walks * num_cubes * max_depth:,} states into {len(paths)} shards")
+    return
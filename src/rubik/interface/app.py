@@ -1,36 +1,167 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
 import gradio as gr
+from fastapi.responses import PlainTextResponse
 
 from plotly import graph_objects as go
 
+from rubik import metrics
 from rubik.cube import Cube
 from rubik.interface.plot import CubeVisualizer
+from rubik.interface.pool import ResourcePool
+
+
+# sessions hold cubes serialized into a few kilobytes, tables of actions being shared by all sessions
+def dumps(cube: Cube) -> bytes:
+    file = io.BytesIO()
+    cube.save(file)
+    return file.getvalue()
+
+
+def loads(data: bytes) -> Cube:
+    return Cube.load(io.BytesIO(data))
+
+
+def rotate_data(data: bytes, moves: str) -> bytes:
+    cube = loads(data)
+    cube.rotate(moves)
+    return dumps(cube)
 
 
-def app(default_size: int = 3, server_port: int = 7860):
+def scramble_data(data: bytes, num_moves: int) -> bytes:
+    cube = loads(data)
+    cube.scramble(num_moves, seed=0)
+    return dumps(cube)
+
+
+class Callbacks:
     """
-    Interface with the following features:
-        - create a cube of the specified size.
-        - ability to scramble it with a specified number of moves.
-        - ability to rotate it through a text field.
-        - display a cube upon creation or update.
+    Asynchronous callbacks of the interface, sessions holding a serialized cube along with their own visualizer.
+    Solved cubes and visualizers are built once per size and shared by all sessions, within a pool holding
+    at most "pool_bytes" bytes of them. The work of callbacks runs in a pool of "num_workers" threads, except
+    for cubes larger than "heavy_size", whose work runs in a separate pool of "num_heavy_workers" threads.
     """
 
-    def create(size) -> tuple[gr.State, gr.State]:
-        cube = Cube(size)
-        cube_visualizer = CubeVisualizer(size)
-        return cube, cube_visualizer
+    def __init__(
+        self,
+        merge_size: int = 30,
+        net_size: int = 60,
+        pool_bytes: int = 2**30,
+        heavy_size: int = 30,
+        num_workers: int = 4,
+        num_heavy_workers: int = 1,
+        timeout: float = 120.0,
+    ):
+        """
+        Create the pools of resources and threads shared by all sessions.
+        """
+        self.net_size = net_size
+        self.heavy_size = heavy_size
+        self.timeout = timeout
+        builders = {
+            "session": lambda size: dumps(Cube(size)),
+            "visualizer": lambda size: CubeVisualizer(size, merge_size),
+        }
+        self.pool = ResourcePool(builders, max_bytes=pool_bytes)
+        self.executors = {
+            False: ThreadPoolExecutor(num_workers, thread_name_prefix="rubik"),
+            True: ThreadPoolExecutor(num_heavy_workers, thread_name_prefix="rubik-heavy"),
+        }
 
-    def scramble(num_moves: int, cube: gr.State) -> gr.State:
-        cube.scramble(num_moves, seed=0)
-        return cube
+    def get_executor(self, size: int) -> ThreadPoolExecutor:
+        """
+        Return the pool of threads running the work of cubes of a given size.
+        """
+        return self.executors[size > self.heavy_size]
 
-    def rotate(moves: str, cube: gr.State) -> gr.State:
-        cube.rotate(moves)
-        return cube
+    async def run(self, size: int, func: Callable[..., Any], *args) -> Any:
+        """
+        Run a function in the pool of threads of cubes of a given size, failing after "timeout" seconds,
+        although the function still completes in the background.
+        """
+        future = asyncio.get_running_loop().run_in_executor(self.get_executor(size), func, *args)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except TimeoutError:
+            raise gr.Error(f"Cube of size {size} took more than {self.timeout} seconds to process") from None
 
-    def display(cube: gr.State, cube_visualizer: gr.State) -> go.Figure:
+    def build_figure(self, data: bytes, cube_visualizer: CubeVisualizer) -> go.Figure:
+        """
+        Build the figure of a serialized cube, as a 2D net above "net_size".
+        """
+        cube = loads(data)
         layout_args = {"autosize": False, "width": 600, "height": 600}
-        return cube_visualizer(cube.coordinates, cube.state, cube.size).update_layout(**layout_args)
+        if cube.size > self.net_size:
+            return cube_visualizer.build_net_figure(cube.facelets, cube.colors).update_layout(**layout_args)
+        return cube_visualizer.update(cube.state, **layout_args)
+
+    async def create(self, size: int, progress=gr.Progress()) -> tuple[bytes, CubeVisualizer]:
+        """
+        Return a solved cube of a given size along with a visualizer of the new session.
+        """
+        progress(0.0, desc=f"Building a cube of size {size}")
+        data = await self.run(size, self.pool.get, "session", size)
+        progress(0.5, desc=f"Building the mesh of a cube of size {size}")
+        cube_visualizer = await self.run(size, self.pool.get, "visualizer", size)
+        return data, cube_visualizer.fork()
+
+    async def scramble(
+        self, num_moves: int, data: bytes, cube_visualizer: CubeVisualizer, progress=gr.Progress()
+    ) -> bytes:
+        """
+        Return a cube scrambled with a given number of random moves.
+        """
+        progress(0.0, desc=f"Scrambling with {num_moves} moves")
+        return await self.run(cube_visualizer.size, scramble_data, data, num_moves)
+
+    async def rotate(self, moves: str, data: bytes, cube_visualizer: CubeVisualizer) -> bytes:
+        """
+        Return a cube rotated by a sequence of moves.
+        """
+        return await self.run(cube_visualizer.size, rotate_data, data, moves)
+
+    async def display(self, data: bytes, cube_visualizer: CubeVisualizer, progress=gr.Progress()) -> go.Figure:
+        """
+        Return the figure of a cube, updating the figure of the session.
+        """
+        progress(0.0, desc="Drawing the cube")
+        return await self.run(cube_visualizer.size, self.build_figure, data, cube_visualizer)
+
+
+def app(
+    default_size: int = 3,
+    server_port: int = 7860,
+    merge_size: int = 30,
+    net_size: int = 60,
+    enable_metrics: bool = False,
+    pool_bytes: int = 2**30,
+    heavy_size: int = 30,
+    num_workers: int = 4,
+    num_heavy_workers: int = 1,
+    timeout: float = 120.0,
+    concurrency_limit: int = 16,
+):
+    """
+    Interface with the following features:
+        - create a cube of the specified size.
+        - ability to scramble it with a specified number of moves.
+        - ability to rotate it through a text field.
+        - display a cube upon creation or update.
+    Cubes larger than "merge_size" are displayed with rectangles of same-colored facelets merged together,
+    and cubes larger than "net_size" are displayed as a 2D net.
+    Solved cubes and visualizers are built once per size and shared by all sessions, within a pool holding
+    at most "pool_bytes" bytes of them, sessions only holding their own state, history and figure.
+    When "enable_metrics" is enabled, or the RUBIK_METRICS environment variable is set, calls to the hot paths
+    are recorded and served in the Prometheus text format at the /metrics route.
+    Callbacks are asynchronous, their work running in a pool of "num_workers" threads, except for cubes larger
+    than "heavy_size", whose work runs in a separate pool of "num_heavy_workers" threads, so that building
+    large cubes never delays small ones. Sessions run at most "concurrency_limit" callbacks at once, and
+    callbacks fail after "timeout" seconds, although their work still completes in the background.
+    """
+    callbacks = Callbacks(merge_size, net_size, pool_bytes, heavy_size, num_workers, num_heavy_workers, timeout)
 
     with gr.Blocks(fill_height=True) as demo:
         # structure
@@ -53,10 +184,26 @@ def app(default_size: int = 3, server_port: int = 7860):
                 plot = gr.Plot(None, container=False)
 
         # interactions
-        demo.load(create, size, [cube, cube_visualizer]).success(display, [cube, cube_visualizer], plot)
-        create_btn.click(create, size, [cube, cube_visualizer]).success(display, [cube, cube_visualizer], plot)
-        scramble_btn.click(scramble, [num_moves, cube], cube).success(display, [cube, cube_visualizer], plot)
-        rotate_btn.click(rotate, [moves, cube], cube).success(display, [cube, cube_visualizer], plot)
+        demo.load(callbacks.create, size, [cube, cube_visualizer]).success(
+            callbacks.display, [cube, cube_visualizer], plot
+        )
+        create_btn.click(callbacks.create, size, [cube, cube_visualizer]).success(
+            callbacks.display, [cube, cube_visualizer], plot
+        )
+        scramble_btn.click(callbacks.scramble, [num_moves, cube, cube_visualizer], cube).success(
+            callbacks.display, [cube, cube_visualizer], plot
+        )
+        rotate_btn.click(callbacks.rotate, [moves, cube, cube_visualizer], cube).success(
+            callbacks.display, [cube, cube_visualizer], plot
+        )
+
+    demo.queue(default_concurrency_limit=concurrency_limit)
+    if not (enable_metrics or metrics.is_enabled()):
+        demo.launch(server_name="0.0.0.0", server_port=server_port)
+        return
 
-    demo.launch(server_name="0.0.0.0", server_port=server_port)
+    metrics.enable()
+    (server, _, _) = demo.launch(server_name="0.0.0.0", server_port=server_port, prevent_thread_lock=True)
+    server.add_api_route("/metrics", lambda: PlainTextResponse(metrics.format_prometheus()), methods=["GET"])
+    demo.block_thread()
     return
@@ -1,8 +1,36 @@
 import copy
+import sys
+import threading
+from typing import Any
+
+import numpy as np
 import plotly.graph_objects as go
 
 import torch
 
+from rubik.metrics import instrument
+
+
+def get_size(obj: Any, seen: set[int] | None = None) -> int:
+    """
+    Number of bytes of an object along with the objects it refers to, through containers and attributes,
+    each object being counted once.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    nbytes = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        nbytes += sum(get_size(key, seen) + get_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        nbytes += sum(get_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        nbytes += get_size(vars(obj), seen)
+    return nbytes
+
 
 class CubeVisualizer:
     """
@@ -10,13 +38,45 @@ class CubeVisualizer:
     Greatly inspired from https://www.kaggle.com/code/edomingo/nxn-rubik-s-cube-3d-interactive-viz-plotly/notebook.
     """
 
-    def __init__(self, size: int):
-        self.vertices = self.build_vertices(size)
-        self.shifts = self.build_shifts()
-        self.x_coor = [v[1] for v in self.vertices]
-        self.y_coor = [v[0] for v in self.vertices]
-        self.z_coor = [v[2] for v in self.vertices]
+    def __init__(self, size: int, merge_size: int = 30):
+        """
+        Create a visualizer for cubes of a given size.
+        Above "merge_size", rectangles of adjacent facelets of the same color are drawn as a single quad.
+        """
+        self.size = size
+        self.merge_size = merge_size
+        self.vertices = np.array(self.build_vertices(size), dtype=np.int64)
+        (self.i_coor, self.j_coor, self.k_coor) = self.build_triangles(size)
+        self.palette = np.array([self.colors[i] for i in range(6)])
+        (self.x_coor, self.y_coor, self.z_coor) = (self.vertices[:, 1], self.vertices[:, 0], self.vertices[:, 2])
         self.fig = self.build_base_figure(size)
+        self._fig_nbytes = get_size(self.fig)
+        # per-session figure, updated in place by patches of the colors of facelets that changed
+        self.figure: go.Figure | None = None
+        self.facecolor: np.ndarray | None = None
+        self.displayed_state: torch.Tensor | None = None
+        # events of a session may run concurrently, and updates of its figure are serialized
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Number of bytes of the geometry and base figure shared by sessions, the base figure being measured once.
+        """
+        arrays = [self.vertices, self.i_coor, self.j_coor, self.k_coor, self.palette]
+        return sum(array.nbytes for array in arrays) + self._fig_nbytes
+
+    def fork(self) -> "CubeVisualizer":
+        """
+        Return a visualizer of a new session, sharing the geometry and base figure of this one, which are
+        never modified, and holding its own figure.
+        """
+        visualizer = copy.copy(self)
+        visualizer.figure = None
+        visualizer.facecolor = None
+        visualizer.displayed_state = None
+        visualizer._lock = threading.Lock()
+        return visualizer
 
     @property
     def colors(self):
@@ -45,15 +105,83 @@ class CubeVisualizer:
         return [vertex for face in face_vertices for vertex in face]
 
     @staticmethod
-    def build_shifts():
-        return [
-            [(0, 1, 0), (1, 0, 0), (1, 1, 0)],  # Up
-            [(0, 1, 0), (0, 0, 1), (0, 1, 1)],  # Left
-            [(1, 0, 0), (0, 0, 1), (1, 0, 1)],  # Front
-            [(0, 1, 0), (0, 0, 1), (0, 1, 1)],  # Right
-            [(1, 0, 0), (0, 0, 1), (1, 0, 1)],  # Back
-            [(0, 1, 0), (1, 0, 0), (1, 1, 0)],  # Down
-        ]
+    def build_quads(
+        size: int,
+        faces: torch.Tensor,
+        c1: torch.Tensor,
+        c2: torch.Tensor,
+        lengths: torch.Tensor,
+        heights: torch.Tensor | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Compute the vertex indices of the 2 complementary triangles covering quads, each quad being a rectangle
+        of adjacent facelets of a face starting at in-plane coordinates (c1, c2), extending over "lengths"
+        facelets along c2 and "heights" facelets along c1 (a single one if not supplied).
+        Indices are returned as 3 tensors of shape (2, number of quads), for first and second triangles.
+        """
+        n = size + 1
+        heights = torch.ones_like(lengths) if heights is None else heights
+        # strides of vertex indices along both in-plane coordinates of facelets of each face, followed
+        # by the steps from the first corner of a facelet to the second and third corners of its triangles
+        strides = torch.tensor(
+            [
+                [1, n, n, 1],  # Up
+                [n, 1, n, 1],  # Left
+                [n, 1, n, 1],  # Front
+                [n, 1, n, 1],  # Right
+                [n, 1, n, 1],  # Back
+                [n, 1, 1, n],  # Down
+            ]
+        )[faces]
+        corners = faces * n**2 + c1 * strides[:, 0] + c2 * strides[:, 1]
+        shift_j = strides[:, 2] * torch.where(strides[:, 2] == strides[:, 1], lengths, heights)
+        shift_k = strides[:, 3] * torch.where(strides[:, 3] == strides[:, 1], lengths, heights)
+
+        i_coor = torch.stack([corners, corners + shift_j + shift_k])
+        j_coor = (corners + shift_j).expand(2, -1)
+        k_coor = (corners + shift_k).expand(2, -1)
+        return (i_coor, j_coor, k_coor)
+
+    @staticmethod
+    def build_triangles(size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compute the vertex indices of the 2 complementary triangles covering each facelet, face after face,
+        in the order of facelets in the cube state. As facelets never move, this is done once and for all.
+        """
+        (faces, c1, c2) = torch.cartesian_prod(torch.arange(6), torch.arange(size), torch.arange(size)).unbind(-1)
+        triangles = CubeVisualizer.build_quads(size, faces, c1, c2, torch.ones_like(faces))
+
+        # first triangle of each facelet, followed by second triangle of each facelet, face after face
+        return tuple(t.reshape(2, 6, -1).transpose(0, 1).reshape(-1).numpy() for t in triangles)
+
+    def build_merged_triangles(self, state: torch.Tensor) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Compute the vertex indices and colors of the 2 complementary triangles covering each rectangle of
+        adjacent facelets of the same color of each face. Runs of same-colored facelets along rows are stacked
+        with the runs of the next rows spanning the same columns with the same color.
+        """
+        n = self.size
+        colors = (state - 1).to(device="cpu", dtype=torch.int64)
+        starts = torch.ones_like(colors, dtype=torch.bool)
+        starts[1:] = colors[1:] != colors[:-1]
+        starts[::n] = True
+
+        positions = starts.nonzero().reshape(-1)
+        lengths = torch.diff(positions, append=torch.tensor([len(colors)]))
+        (faces, c1, c2, colors) = (positions // n**2, positions // n % n, positions % n, colors[positions])
+
+        # sort runs by face, column, length and color, then by row, so that stacked runs follow each other
+        keys = ((faces * n + c2) * (n + 1) + lengths) * 6 + colors
+        order = torch.argsort(keys * n + c1)
+        (keys, rows) = (keys[order], c1[order])
+        tops = torch.ones_like(keys, dtype=torch.bool)
+        tops[1:] = (keys[1:] != keys[:-1]) | (rows[1:] != rows[:-1] + 1)
+        heights = torch.diff(tops.nonzero().reshape(-1), append=torch.tensor([len(tops)]))
+
+        quads = order[tops]
+        triangles = self.build_quads(n, faces[quads], c1[quads], c2[quads], lengths[quads], heights)
+        (i_coor, j_coor, k_coor) = (t.reshape(-1).numpy() for t in triangles)
+        return (i_coor, j_coor, k_coor, self.palette[colors[quads].repeat(2).numpy()])
 
     @staticmethod
     def build_base_figure(size):
@@ -65,10 +193,18 @@ class CubeVisualizer:
         # add black lines to the cube
         lines_seq = [[0, size, size, 0, 0], [0, 0, size, size, 0]]
         lines_args = {"mode": "lines", "line": {"width": 5, "color": "black"}, "hoverinfo": "none"}
+        # all lines are merged into a single trace, separated by gaps
+        (x_coor, y_coor, z_coor) = ([], [], [])
         for i in range(size + 1):
-            fig.add_trace(go.Scatter3d(x=[i] * 5, y=lines_seq[1], z=lines_seq[0], **lines_args))
-            fig.add_trace(go.Scatter3d(x=lines_seq[1], y=[i] * 5, z=lines_seq[0], **lines_args))
-            fig.add_trace(go.Scatter3d(x=lines_seq[0], y=lines_seq[1], z=[i] * 5, **lines_args))
+            for x, y, z in [
+                ([i] * 5, lines_seq[1], lines_seq[0]),
+                (lines_seq[1], [i] * 5, lines_seq[0]),
+                (lines_seq[0], lines_seq[1], [i] * 5),
+            ]:
+                x_coor += x + [None]
+                y_coor += y + [None]
+                z_coor += z + [None]
+        fig.add_trace(go.Scatter3d(x=x_coor, y=y_coor, z=z_coor, **lines_args))
 
         # add text along each axis
         fig.add_trace(
@@ -104,53 +240,125 @@ class CubeVisualizer:
             },
         )
 
+    @instrument
     def __call__(self, coordinates: torch.Tensor, state: torch.Tensor, size: int) -> go.Figure:
         """
         Generates a 3D plot of a cube given its coordinates, state and size.
         """
-        # set the color of each facelet, face after face
-        face_state = (state - 1).reshape(6, -1).tolist()
-        face_colors = [[self.colors[f] for f in face] for face in face_state]
-
-        face_coordinates = [coordinates[1:, (coordinates[0] == i)].transpose(0, 1).tolist() for i in range(6)]
-
-        # for each facelet of a face, draw 2 complementary triangles covering it
-        i_coor = []
-        j_coor = []
-        k_coor = []
-        facecolor = []
-        for i in range(6):
-            face = face_coordinates[i]
-            if i == 0:
-                face = [[x, y, size] for x, y, z in face]
-            if i == 2:
-                face = [[x, size, z] for x, y, z in face]
-            if i == 3:
-                face = [[size, y, z] for x, y, z in face]
-
-            # add first triangle of each facelet
-            i_coor += [self.vertices.index(p) for p in face]
-            j_coor += [self.vertices.index([c + s for c, s in zip(p, self.shifts[i][0])]) for p in face]
-            k_coor += [self.vertices.index([c + s for c, s in zip(p, self.shifts[i][1])]) for p in face]
-
-            # add second triangle of each facelet
-            i_coor += [self.vertices.index([c + s for c, s in zip(p, self.shifts[i][2])]) for p in face]
-            j_coor += [self.vertices.index([c + s for c, s in zip(p, self.shifts[i][0])]) for p in face]
-            k_coor += [self.vertices.index([c + s for c, s in zip(p, self.shifts[i][1])]) for p in face]
-
-            facecolor += face_colors[i] * 2
-
         fig = copy.deepcopy(self.fig)
-        return fig.add_trace(
-            go.Mesh3d(
-                x=self.x_coor,
-                y=self.y_coor,
-                z=self.z_coor,
-                i=i_coor,
-                j=j_coor,
-                k=k_coor,
-                facecolor=facecolor,
-                opacity=1,
+        if self.size > self.merge_size:
+            (i_coor, j_coor, k_coor, facecolor) = self.build_merged_triangles(state)
+            return fig.add_trace(self.build_mesh(facecolor, (i_coor, j_coor, k_coor)))
+
+        # set the color of each facelet, face after face, once for each of its 2 triangles
+        face_state = (state - 1).to(device="cpu", dtype=torch.int64).reshape(6, 1, -1).numpy()
+        facecolor = self.palette[face_state.repeat(2, axis=1)].reshape(-1).tolist()
+        return fig.add_trace(self.build_mesh(facecolor))
+
+    def build_mesh(
+        self,
+        facecolor: list[str] | np.ndarray,
+        triangles: tuple[list[int], list[int], list[int]] | tuple[np.ndarray, np.ndarray, np.ndarray] | None = None,
+    ) -> go.Mesh3d:
+        """
+        Create the mesh of facelets of the cube, given the color of each of its triangles.
+        Triangles default to the 2 triangles covering each facelet.
+        """
+        (i_coor, j_coor, k_coor) = triangles or (self.i_coor, self.j_coor, self.k_coor)
+        return go.Mesh3d(
+            x=self.x_coor,
+            y=self.y_coor,
+            z=self.z_coor,
+            i=i_coor,
+            j=j_coor,
+            k=k_coor,
+            facecolor=facecolor,
+            opacity=1,
+            hoverinfo="none",
+        )
+
+    def build_net_figure(self, facelets: list[list[list[str]]], colors: list[str]) -> go.Figure:
+        """
+        Generates a 2D plot of the net of a cube given its facelets, as returned by "Cube.facelets",
+        and the colors they refer to. This is much lighter than a 3D plot, and thus suits large cubes.
+        """
+        size = len(facelets[0])
+        indices = {color: i for i, color in enumerate(colors)}
+        grid = np.full((3 * size, 4 * size), np.nan)
+        # row and column of the top-left facelet of each face within the net
+        origins = [(0, size), (size, 0), (size, size), (size, 2 * size), (size, 3 * size), (2 * size, size)]
+        for face, (row, col) in zip(facelets, origins):
+            grid[row : row + size, col : col + size] = [[indices[c] for c in r] for r in face]
+
+        # each color spans an interval of same length in the color scale
+        palette = self.palette.tolist()
+        colorscale = [[bound / 6, color] for i, color in enumerate(palette) for bound in (i, i + 1)]
+        fig = go.Figure(
+            go.Heatmap(
+                z=grid,
+                zmin=-0.5,
+                zmax=5.5,
+                colorscale=colorscale,
+                showscale=False,
+                xgap=1,
+                ygap=1,
                 hoverinfo="none",
             )
         )
+        axis = {"visible": False, "showgrid": False, "zeroline": False}
+        return fig.update_layout(
+            showlegend=False,
+            plot_bgcolor="rgba(0, 0, 0, 0)",
+            xaxis=axis,
+            yaxis={**axis, "autorange": "reversed", "scaleanchor": "x"},
+        )
+
+    def patch(self, state: torch.Tensor) -> dict[str, list]:
+        """
+        Compute the positions and new colors of the triangles whose color changed since the last patch,
+        that is the 2 triangles of each facelet whose color differs from the previously patched state.
+        """
+        state = state.to(device="cpu", dtype=torch.int64)
+        if self.displayed_state is None:
+            changed = torch.arange(len(state))
+        else:
+            changed = (state != self.displayed_state).nonzero().reshape(-1)
+        self.displayed_state = state.clone()
+
+        # triangles of a facelet are located at the same offset within both halves of its face
+        m = len(state) // 6
+        positions = (changed // m * 2 * m + changed % m).unsqueeze(-1) + torch.tensor([0, m])
+        colors = self.palette[(state[changed] - 1).repeat_interleave(2).numpy()]
+        return {"indices": positions.reshape(-1).tolist(), "colors": colors.tolist()}
+
+    def update(self, state: torch.Tensor, **layout_args) -> go.Figure:
+        """
+        Update the figure of the session after a change of state and return it, only recoloring facelets
+        that changed instead of rebuilding the figure. The figure is built on first call. Patches only save
+        work on the server, since the interface sends whole figures to browsers.
+        Above "merge_size", quads of merged facelets depend on the state, so that the mesh is rebuilt.
+        Concurrent updates run one at a time.
+        """
+        with self._lock:
+            if self.size > self.merge_size:
+                (i_coor, j_coor, k_coor, facecolor) = self.build_merged_triangles(state)
+                if self.figure is None:
+                    self.figure = copy.deepcopy(self.fig).update_layout(**layout_args)
+                else:
+                    self.figure.data = self.figure.data[:-1]
+                self.figure.add_trace(self.build_mesh(facecolor, (i_coor, j_coor, k_coor)))
+                self.displayed_state = state.to(device="cpu", dtype=torch.int64).clone()
+                return self.figure
+
+            patch = self.patch(state)
+            if self.figure is None:
+                self.facecolor = np.empty(len(self.i_coor), dtype=self.palette.dtype)
+                self.facecolor[patch["indices"]] = patch["colors"]
+                self.figure = copy.deepcopy(self.fig).add_trace(self.build_mesh(self.facecolor.copy()))
+                self.figure.update_layout(**layout_args)
+            elif patch["indices"]:
+                assert self.facecolor is not None, "colors of triangles are set along with the figure"
+                self.facecolor[patch["indices"]] = patch["colors"]
+                # figures skip assignments of values equal to current ones, hence the copy
+                self.figure.data[-1].facecolor = self.facecolor.copy()
+            return self.figure
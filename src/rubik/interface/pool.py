@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+
+import torch
+from loguru import logger
+
+
+def get_nbytes(resource: Any) -> int:
+    """
+    Number of bytes of a resource: the size of a tensor or of bytes, or the "nbytes" attribute of other objects.
+    """
+    if isinstance(resource, torch.Tensor):
+        return resource.numel() * resource.element_size()
+    if isinstance(resource, bytes):
+        return len(resource)
+    return int(getattr(resource, "nbytes", 0))
+
+
+class ResourcePool:
+    """
+    A thread-safe pool of immutable resources of cubes, built once per size by registered builders and
+    shared by all sessions, concurrent requests of a resource sharing a single build. Least recently used
+    resources are evicted once their total number of bytes exceeds "max_bytes", the most recently used one
+    being always kept.
+    """
+
+    def __init__(self, builders: dict[str, Callable[[int], Any]], max_bytes: int = 2**30):
+        """
+        Create an empty pool of resources, built by the function registered under their name.
+        """
+        self.builders = builders
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        # internal-only attributes
+        self._resources: OrderedDict[tuple[str, int], tuple[Any, int]] = OrderedDict()
+        self._pending: dict[tuple[str, int], Future] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def __contains__(self, key: tuple[str, int]) -> bool:
+        return key in self._resources
+
+    def get(self, name: str, size: int) -> Any:
+        """
+        Return the resource of a given name for cubes of a given size, building it if missing.
+        Concurrent requests of a resource being built wait for that build instead of starting their own,
+        while requests of other resources proceed.
+        """
+        key = (name, size)
+        with self._lock:
+            if key in self._resources:
+                self._resources.move_to_end(key)
+                return self._resources[key][0]
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = Future()
+        if pending is not None:
+            return pending.result()
+
+        try:
+            resource = self.builders[name](size)
+        except BaseException as error:
+            with self._lock:
+                self._pending.pop(key).set_exception(error)
+            raise
+        self.put(key, resource)
+        with self._lock:
+            self._pending.pop(key).set_result(resource)
+        return resource
+
+    def put(self, key: tuple[str, int], resource: Any) -> None:
+        """
+        Store a resource, evicting least recently used ones beyond the capacity of the pool.
+        """
+        nbytes = get_nbytes(resource)
+        with self._lock:
+            if key in self._resources:
+                self.nbytes -= self._resources[key][1]
+            self._resources[key] = (resource, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes and len(self._resources) > 1:
+                ((evicted_name, evicted_size), (_, evicted_nbytes)) = self._resources.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+                logger.debug(f"Evicted {evicted_name} resource of size {evicted_size} ({evicted_nbytes:,} bytes)")
+        return
+
+    def clear(self) -> None:
+        """
+        Evict all resources.
+        """
+        with self._lock:
+            self._resources.clear()
+            self.nbytes = 0
+        return
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, TypeVar
+
+import torch
+
+
+METRICS_ENV = "RUBIK_METRICS"
+LATENCY_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0, float("inf"))
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# instrumented functions only check this flag when disabled
+_enabled = os.environ.get(METRICS_ENV, "0") not in ("", "0")
+_lock = threading.Lock()
+_metrics: dict[str, dict[str, Any]] = {}
+
+
+def is_enabled() -> bool:
+    """
+    Whether instrumented functions currently record metrics.
+    """
+    return _enabled
+
+
+def enable(enabled: bool = True) -> None:
+    """
+    Start or stop recording metrics of instrumented functions. Recording is enabled at import time
+    when the RUBIK_METRICS environment variable is set to a value other than 0.
+    """
+    global _enabled
+    _enabled = enabled
+    return
+
+
+@contextmanager
+def collect() -> Iterator[None]:
+    """
+    Record metrics of instrumented functions within a context.
+    Example:
+        with collect():
+            cube.rotate("X0 Y1")
+        print(snapshot())
+    """
+    previous = _enabled
+    enable(True)
+    try:
+        yield
+    finally:
+        enable(previous)
+
+
+def get_nbytes(output: Any) -> int:
+    """
+    Number of bytes of the tensors returned by a function, either directly or in a tuple or a list.
+    """
+    if isinstance(output, torch.Tensor):
+        return output.numel() * output.element_size()
+    if isinstance(output, (tuple, list)):
+        return sum(get_nbytes(item) for item in output if isinstance(item, (torch.Tensor, tuple, list)))
+    return 0
+
+
+def record(name: str, duration: float, nbytes: int = 0) -> None:
+    """
+    Record a call to a function, given its duration in seconds and the number of bytes of tensors it returned.
+    """
+    with _lock:
+        metrics = _metrics.get(name)
+        if metrics is None:
+            metrics = _metrics[name] = {"count": 0, "seconds": 0.0, "bytes": 0, "buckets": [0] * len(LATENCY_BUCKETS)}
+        metrics["count"] += 1
+        metrics["seconds"] += duration
+        metrics["bytes"] += nbytes
+        metrics["buckets"][bisect_left(LATENCY_BUCKETS, duration)] += 1
+    return
+
+
+def instrument(func: F) -> F:
+    """
+    Decorate a function so that its calls are recorded under its qualified name while recording is enabled.
+    """
+    name = func.__qualname__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        output = func(*args, **kwargs)
+        record(name, time.perf_counter() - start, get_nbytes(output))
+        return output
+
+    return wrapper  # type: ignore[return-value]
+
+
+def snapshot() -> dict[str, dict[str, Any]]:
+    """
+    Return a copy of the metrics recorded so far, mapping the name of each instrumented function to its
+    number of calls, its cumulative duration in seconds, the cumulative number of bytes of tensors it
+    returned, and the number of calls per latency bucket of LATENCY_BUCKETS (not cumulative).
+    """
+    with _lock:
+        return {name: {**metrics, "buckets": list(metrics["buckets"])} for name, metrics in _metrics.items()}
+
+
+def reset() -> None:
+    """
+    Forget all metrics recorded so far.
+    """
+    with _lock:
+        _metrics.clear()
+    return
+
+
+def format_prometheus(metrics: dict[str, dict[str, Any]] | None = None) -> str:
+    """
+    Format metrics, the current ones if not supplied, in the Prometheus text exposition format.
+    """
+    metrics = snapshot() if metrics is None else metrics
+    lines = [
+        "# HELP rubik_call_duration_seconds Duration of calls to instrumented functions.",
+        "# TYPE rubik_call_duration_seconds histogram",
+    ]
+    for name, values in metrics.items():
+        count = 0
+        for bound, bucket in zip(LATENCY_BUCKETS, values["buckets"]):
+            count += bucket
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'rubik_call_duration_seconds_bucket{{function="{name}",le="{le}"}} {count}')
+        lines.append(f'rubik_call_duration_seconds_sum{{function="{name}"}} {values["seconds"]!r}')
+        lines.append(f'rubik_call_duration_seconds_count{{function="{name}"}} {values["count"]}')
+    lines += [
+        "# HELP rubik_call_output_bytes_total Bytes of tensors returned by instrumented functions.",
+        "# TYPE rubik_call_output_bytes_total counter",
+    ]
+    for name, values in metrics.items():
+        lines.append(f'rubik_call_output_bytes_total{{function="{name}"}} {values["bytes"]}')
+    return "\n".join(lines) + "\n"
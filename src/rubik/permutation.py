@@ -0,0 +1,72 @@
+import math
+
+import torch
+
+
+def cycle_decomposition(permutation: torch.Tensor) -> list[list[int]]:
+    """
+    Decompose a permutation into its cycles, each given as the list of positions i, p[i], p[p[i]], ...
+    Fixed positions are returned as cycles of length 1.
+    """
+    targets = permutation.tolist()
+    visited = [False] * len(targets)
+    cycles = []
+    for start in range(len(targets)):
+        if visited[start]:
+            continue
+        cycle = []
+        position = start
+        while not visited[position]:
+            visited[position] = True
+            cycle.append(position)
+            position = targets[position]
+        cycles.append(cycle)
+    return cycles
+
+
+def permutation_order(permutation: torch.Tensor) -> int:
+    """
+    Compute the order of a permutation, that is the least number of times it must be applied
+    to get back to identity, as the least common multiple of its cycle lengths.
+    """
+    return math.lcm(*(len(cycle) for cycle in cycle_decomposition(permutation)))
+
+
+def permutation_power(permutation: torch.Tensor, exponent: int) -> torch.Tensor:
+    """
+    Compute the permutation resulting from applying a permutation "exponent" times, in a number of
+    operations proportional to its length whatever the exponent. Negative exponents yield powers of
+    the inverse permutation.
+    """
+    cycles = cycle_decomposition(permutation)
+    positions = torch.tensor([position for cycle in cycles for position in cycle], dtype=torch.int64)
+    lengths = torch.tensor([len(cycle) for cycle in cycles], dtype=torch.int64)
+    shifts = torch.tensor([exponent % len(cycle) for cycle in cycles], dtype=torch.int64)
+
+    # each position of a cycle is sent to the position located "exponent" steps further along the cycle
+    starts = (torch.cumsum(lengths, dim=0) - lengths).repeat_interleave(lengths)
+    offsets = torch.arange(len(positions)) - starts
+    shifts = shifts.repeat_interleave(lengths)
+    lengths = lengths.repeat_interleave(lengths)
+    targets = positions[starts + (offsets + shifts) % lengths]
+
+    power = torch.empty_like(positions)
+    power[positions] = targets
+    return power.to(device=permutation.device)
+
+
+def generate_permutation_group(generators: list[torch.Tensor]) -> torch.Tensor:
+    """
+    Compute all permutations obtained by combining some generators, as a 2D tensor whose first row is
+    identity, followed by the other permutations in order of discovery by a breadth-first search.
+    """
+    identity = torch.arange(len(generators[0]), dtype=torch.int64, device=generators[0].device)
+    (group, frontier) = ({tuple(identity.tolist()): identity}, [identity])
+    while frontier:
+        candidates = [permutation[generator] for permutation in frontier for generator in generators]
+        frontier = []
+        for permutation in candidates:
+            if tuple(permutation.tolist()) not in group:
+                group[tuple(permutation.tolist())] = permutation
+                frontier.append(permutation)
+    return torch.stack(list(group.values()))
@@ -0,0 +1,176 @@
+import time
+
+from loguru import logger
+
+import torch
+
+from rubik.action import format_actions_str
+from rubik.cube import Cube
+from rubik.state import build_cube_tensor, pack_state
+
+
+class MoveSearch:
+    """
+    A breadth-first search of all shortest sequences of moves bringing a cube into a state where some facelets
+    match their initial color. Frontiers are expanded as batches of states, each move being a gather of
+    all states of a batch, and states are deduplicated through a hash set of their bytes, packed 3 bits per facelet.
+    When all facelets are constrained, searches run from both ends and meet in the middle.
+    """
+
+    def __init__(self, cube: Cube, max_numel: int = 2**26):
+        """
+        Create a search starting from the current state of a cube.
+        Frontiers are expanded by chunks of at most "max_numel" facelets.
+        """
+        self.moves = [(axis, slice, inverse) for axis in range(3) for slice in range(cube.size) for inverse in range(2)]
+        self.actions = torch.stack([cube.actions[move] for move in self.moves]).cpu()  # size = (M, 6 * size**2)
+        self.start = cube.state.to(device="cpu", dtype=torch.uint8)
+        self.target = build_cube_tensor(cube.size).values().to(dtype=torch.uint8)
+        self.max_numel = max_numel
+        self.num_expanded = 0
+        self.duration = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Number of states expanded per second by the last search.
+        """
+        return self.num_expanded / max(self.duration, 1e-9)
+
+    def __call__(self, mask: torch.Tensor | None = None, max_depth: int = 6) -> list[str]:
+        """
+        Return all shortest sequences of at most "max_depth" moves bringing the facelets selected by a boolean
+        mask over facelet positions to their initial color, or an empty list if there is none.
+        All facelets are selected when no mask is supplied.
+        """
+        (self.num_expanded, start) = (0, time.perf_counter())
+        if mask is None or bool(mask.all()):
+            sequences = self.search_bidirectional(max_depth)
+        else:
+            sequences = self.search_forward(mask.to(device="cpu", dtype=torch.bool), max_depth)
+        self.duration = time.perf_counter() - start
+        logger.debug(f"Expanded {self.num_expanded:,} states at {self.throughput:,.0f} states/sec")
+        return [format_actions_str([self.moves[move] for move in sequence]) for sequence in sequences]
+
+    def search_forward(self, mask: torch.Tensor, max_depth: int) -> list[list[int]]:
+        """
+        Expand states from the start until some of them match the target on masked facelets.
+        """
+        states = self.start.unsqueeze(0)
+        visited = {pack_state(self.start).numpy().tobytes(): (0, 0)}
+        levels: list[tuple[torch.Tensor, torch.Tensor, torch.Tensor]] = []
+        for depth in range(max_depth + 1):
+            matches = (states[:, mask] == self.target[mask]).all(dim=-1).nonzero().reshape(-1)
+            if len(matches) or depth == max_depth or not len(states):
+                return [sequence for index in matches.tolist() for sequence in self.trace(levels, depth, index)]
+            (states, _, edges) = self.expand(states, self.actions, visited, depth + 1)
+            levels.append(edges)
+        return []
+
+    def search_bidirectional(self, max_depth: int) -> list[list[int]]:
+        """
+        Expand states alternately from the start and from the target, the smallest frontier first,
+        until both searches meet.
+        """
+        if torch.equal(self.start, self.target):
+            return [[]]
+
+        # searching backward applies inverse moves, which are next to their direct move
+        inverse_actions = self.actions[torch.arange(len(self.moves)) ^ 1]
+        sides = [
+            {
+                "states": state.unsqueeze(0),
+                "visited": {pack_state(state).numpy().tobytes(): (0, 0)},
+                "levels": [],
+                "actions": a,
+            }
+            for state, a in [(self.start, self.actions), (self.target, inverse_actions)]
+        ]
+        while len(sides[0]["levels"]) + len(sides[1]["levels"]) < max_depth:
+            (side, other) = sides if len(sides[0]["states"]) <= len(sides[1]["states"]) else sides[::-1]
+            depth = len(side["levels"]) + 1
+            (side["states"], keys, edges) = self.expand(side["states"], side["actions"], side["visited"], depth)
+            side["levels"].append(edges)
+            if not keys:
+                return []
+
+            # states of the new level already reached from the other end, at the least total depth
+            meetings = [(index, other["visited"][key]) for index, key in enumerate(keys) if key in other["visited"]]
+            if meetings:
+                other_depth = min(other_depth for _, (other_depth, _) in meetings)
+                sequences = []
+                for index, (_, other_index) in [m for m in meetings if m[1][0] == other_depth]:
+                    paths = [
+                        self.trace(side["levels"], depth, index),
+                        self.trace(other["levels"], other_depth, other_index),
+                    ]
+                    (prefixes, suffixes) = paths if side is sides[0] else paths[::-1]
+                    sequences += [prefix + suffix[::-1] for prefix in prefixes for suffix in suffixes]
+                return sequences
+        return []
+
+    def expand(
+        self, states: torch.Tensor, actions: torch.Tensor, visited: dict[bytes, tuple[int, int]], depth: int
+    ) -> tuple[torch.Tensor, list[bytes], tuple[torch.Tensor, torch.Tensor, torch.Tensor]]:
+        """
+        Apply all moves to a batch of states, and return the states never visited before along with their bytes,
+        as well as the edges (child, parent, move) reaching each of them from the batch, which are all the
+        shortest ones. Visited states are recorded with their depth and index within their level.
+        """
+        (num_moves, length) = actions.shape
+        chunk_size = max(1, self.max_numel // (num_moves * length))
+        new_states: list[torch.Tensor] = []
+        new_keys: list[bytes] = []
+        edges: list[tuple[torch.Tensor, torch.Tensor, torch.Tensor]] = []
+        for start in range(0, len(states), chunk_size):
+            parents = torch.arange(start, min(start + chunk_size, len(states)))
+            children = states[parents][:, actions].reshape(-1, length)  # size = (chunk * M, 6 * size**2)
+            (rows, inverse) = torch.unique(children, dim=0, return_inverse=True)
+
+            # look distinct children up in the hash set, children visited at a lower depth being dropped
+            (indices, is_new) = ([], [])
+            for key in map(bytes, pack_state(rows).numpy()):
+                seen = visited.get(key)
+                is_new.append(seen is None)
+                if seen is None:
+                    seen = visited[key] = (depth, len(new_keys))
+                    new_keys.append(key)
+                indices.append(seen[1] if seen[0] == depth else -1)
+            new_states.append(rows[torch.tensor(is_new, dtype=torch.bool)])
+
+            indices = torch.tensor(indices, dtype=torch.int64)[inverse]
+            kept = indices >= 0
+            moves = torch.arange(num_moves).repeat(len(parents))
+            edges.append((indices[kept], parents.repeat_interleave(num_moves)[kept], moves[kept]))
+            self.num_expanded += len(parents)
+
+        states = torch.cat(new_states) if new_states else states[:0]
+        return (states, new_keys, tuple(torch.cat(tensors) for tensors in zip(*edges)))
+
+    @staticmethod
+    def trace(levels: list[tuple[torch.Tensor, torch.Tensor, torch.Tensor]], depth: int, index: int) -> list[list[int]]:
+        """
+        Return all sequences of moves reaching the state of a given index at a given depth of a search.
+        """
+        if depth == 0:
+            return [[]]
+        (children, parents, moves) = levels[depth - 1]
+        edges = (children == index).nonzero().reshape(-1)
+        return [
+            sequence + [move]
+            for parent, move in zip(parents[edges].tolist(), moves[edges].tolist())
+            for sequence in MoveSearch.trace(levels, depth - 1, parent)
+        ]
+
+
+def search(cube: Cube, mask: torch.Tensor | None = None, max_depth: int = 6) -> list[str]:
+    """
+    Return all shortest sequences of at most "max_depth" moves bringing the facelets of a cube selected
+    by a boolean mask over facelet positions to their initial color. All facelets are selected when no
+    mask is supplied.
+    Example:
+        mask = torch.zeros(6 * cube.size**2, dtype=torch.bool)
+        mask[: cube.size**2] = True  # facelets of the Up face
+        search(cube, mask)
+    """
+    return MoveSearch(cube)(mask, max_depth)
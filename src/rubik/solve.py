@@ -0,0 +1,155 @@
+from functools import lru_cache, partial
+from operator import itemgetter
+from pathlib import Path
+
+import torch
+
+from rubik.action import build_actions_tensor, build_successor_table, format_actions_str
+from rubik.cache import load_actions_tensor, read_table
+from rubik.cube import Cube
+from rubik.state import build_cube_tensor
+
+
+SOLVABLE_SIZES = (2, 3)
+GROUP_SIZE = 4
+UNKNOWN_DISTANCE = 15
+
+
+def get_pattern_groups(size: int) -> list[list[int]]:
+    """
+    Split cubies into groups of at most 4, each cubie being represented by one of its facelets,
+    whose position and orientation are fixed by those of this reference facelet.
+    Cubies with the most facelets come first, so that corners, edges and centers are grouped separately.
+    """
+    cubies: dict[tuple[int, int, int], list[int]] = {}
+    for facelet, position in enumerate(build_cube_tensor(size).indices()[1:].transpose(0, 1).tolist()):
+        cubies.setdefault(tuple(position), []).append(facelet)
+    references = [facelets[0] for facelets in sorted(cubies.values(), key=lambda f: (-len(f), f[0]))]
+    return [references[i : i + GROUP_SIZE] for i in range(0, len(references), GROUP_SIZE)]
+
+
+def build_pattern_database(size: int, group: int) -> torch.Tensor:
+    """
+    Build the pattern database of a group of reference facelets, holding for each placement of these
+    facelets the least number of moves bringing them back to their initial positions, found by a
+    breadth-first search. Placements are indexed by the positions of facelets written in base 6 * size**2,
+    and distances are packed 2 per byte, the low nibble coming first. Unreachable placements hold 15,
+    and distances are capped to 14.
+    """
+    references = torch.tensor(get_pattern_groups(size)[group], dtype=torch.int64)
+    actions = build_actions_tensor(size).reshape(-1, 6 * size**2)
+    length = actions.shape[-1]
+
+    # a move brings the facelet at position actions[q] to position q
+    destinations = torch.argsort(actions, dim=-1)
+    weights = length ** torch.arange(len(references) - 1, -1, -1)
+    distances = torch.full((length ** len(references),), UNKNOWN_DISTANCE, dtype=torch.uint8)
+    frontier = references.unsqueeze(0)
+    distances[(frontier * weights).sum(dim=-1)] = 0
+    depth = 0
+    while len(frontier):
+        depth += 1
+        placements = destinations[:, frontier].reshape(-1, len(references))
+        indices = torch.unique((placements * weights).sum(dim=-1))
+        indices = indices[distances[indices] == UNKNOWN_DISTANCE]
+        distances[indices] = min(depth, UNKNOWN_DISTANCE - 1)
+        frontier = indices.unsqueeze(-1) // weights % length
+
+    distances = torch.cat([distances, distances.new_full((len(distances) % 2,), UNKNOWN_DISTANCE)])
+    return distances[0::2] | (distances[1::2] << 4)
+
+
+@lru_cache(maxsize=4)
+def load_pattern_databases(size: int, cache_dir: str | Path | None = None) -> list[torch.Tensor]:
+    """
+    Load the pattern databases of all groups of cubies of a cube of a given size, as read-only
+    memory-mapped tensors. Databases are built and cached first if missing.
+    """
+    return [
+        read_table(f"pattern-{group}", size, cache_dir, builder=partial(build_pattern_database, group=group))
+        for group in range(len(get_pattern_groups(size)))
+    ]
+
+
+def get_facelet_permutation(cube: Cube) -> torch.Tensor:
+    """
+    Convert the state of a cube into a permutation of facelets, mapping each position to the facelet of
+    the initial state lying there. A facelet is identified by its color along with the set of colors of
+    its cubie, which requires cubies to have distinct sets of colors, as is the case up to size 3.
+    """
+    tensor = build_cube_tensor(cube.size)
+    (_, cubies) = torch.unique(tensor.indices()[1:], dim=1, return_inverse=True)
+    keys = []
+    for state in [tensor.values(), cube.state.to(device="cpu", dtype=torch.int64)]:
+        # colors of a cubie are distinct, so that summing powers of 2 yields the bitmask of its colors
+        masks = torch.zeros(int(cubies.max()) + 1, dtype=torch.int64).index_add_(0, cubies, 2**state)
+        keys.append(masks[cubies] * 8 + state)
+
+    (initial_keys, facelets) = keys[0].sort()
+    indices = torch.searchsorted(initial_keys, keys[1]).clamp(max=len(facelets) - 1)
+    if not torch.equal(initial_keys[indices], keys[1]) or len(indices.unique()) != len(indices):
+        raise ValueError("Cube state cannot be reached from the initial state")
+    return facelets[indices]
+
+
+def solve(cube: Cube, max_depth: int = 30, cache_dir: str | Path | None = None) -> str:
+    """
+    Find a shortest sequence of moves bringing a cube of size 2 or 3 back to its initial state, using
+    an iterative deepening A* search guided by pattern databases, the heuristic being the largest
+    distance they hold. Searched states are permutations of facelets, so that moves are tuple lookups.
+    Example:
+        cube.rotate(solve(cube)) restores the cube to its initial state.
+    """
+    if cube.size not in SOLVABLE_SIZES:
+        raise ValueError(f"Solving is supported for cubes of size {SOLVABLE_SIZES}, got size {cube.size}")
+
+    size = cube.size
+    length = 6 * size**2
+    moves = [(axis, slice, inverse) for axis in range(3) for slice in range(size) for inverse in range(2)]
+    actions = load_actions_tensor(size, cache_dir)
+    getters = [itemgetter(*actions[move].tolist()) for move in moves]
+    groups = get_pattern_groups(size)
+    databases = [database.numpy().data for database in load_pattern_databases(size, cache_dir)]
+
+    # the database of a group holds distances from positions of its facelets, which are those of the
+    # inverse permutation, and inverse permutations are solved in as many moves
+    def heuristic(state: tuple[int, ...]) -> int:
+        distance = 0
+        for references, database in zip(groups, databases):
+            index = 0
+            for facelet in references:
+                index = index * length + state[facelet]
+            distance = max(distance, (database[index >> 1] >> ((index & 1) << 2)) & 15)
+        return distance
+
+    # only sequences of moves in normal form are searched, moves along the same axis commuting
+    transitions = [[(m, t) for m, t in enumerate(row) if t >= 0] for row in build_successor_table(size).tolist()]
+
+    goal = tuple(range(length))
+    path: list[int] = []
+    next_bound = max_depth + 1
+
+    def search(state: tuple[int, ...], depth: int, bound: int, node: int) -> bool:
+        nonlocal next_bound
+        if state == goal:
+            return True
+        for move, transition in transitions[node]:
+            child = getters[move](state)
+            estimate = depth + 1 + heuristic(child)
+            if estimate > bound:
+                next_bound = min(next_bound, estimate)
+                continue
+            path.append(move)
+            if search(child, depth + 1, bound, transition):
+                return True
+            path.pop()
+        return False
+
+    start = tuple(get_facelet_permutation(cube).tolist())
+    bound = heuristic(start)
+    while bound <= max_depth:
+        next_bound = max_depth + 1
+        if search(start, 0, bound, 0):
+            return format_actions_str([moves[move] for move in path])
+        bound = next_bound
+    raise ValueError(f"No sequence of at most {max_depth} moves solves the cube")
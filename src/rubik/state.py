@@ -1,9 +1,16 @@
+from functools import lru_cache
+
 import torch
 
 
+BITS_PER_FACELET = 3
+
+
+@lru_cache(maxsize=16)
 def build_cube_tensor(size: int) -> torch.Tensor:
     """
     Convert a list of 6 colors and size into a sparse 4D tensor representing a cube.
+    The tensor is shared by all callers asking for a given size, and must not be modified in place.
     """
     assert isinstance(size, int) and size > 1, f"Expected non-zero integrer size, got {size}"
 
@@ -19,6 +26,25 @@ def build_cube_tensor(size: int) -> torch.Tensor:
     return tensor.to_sparse()
 
 
+@lru_cache(maxsize=16)
+def build_face_index(size: int) -> torch.Tensor:
+    """
+    Build a 3D tensor of shape (6, size, size) mapping each facelet of each face, as displayed row by row,
+    to its position in the state of a cube, so that faces are gathered from the state without building
+    the dense 4D tensor. Facelets of a face are ordered in the state by their 2 in-plane coordinates.
+    """
+    blocks = torch.arange(6 * size**2).reshape(6, size, size)
+    faces = [
+        blocks[0].transpose(0, 1),  # up
+        blocks[1].flip(1).transpose(0, 1),  # left
+        blocks[2].flip(1).transpose(0, 1),  # front
+        blocks[3].flip(0).flip(1).transpose(0, 1),  # right
+        blocks[4].flip(0).flip(1).transpose(0, 1),  # back
+        blocks[5].flip(1).transpose(0, 1),  # down
+    ]
+    return torch.stack(faces)
+
+
 def build_permutation_matrix(size: int, perm: str) -> torch.Tensor:
     """
     Convert a permutation sting into a sparse 2D matrix.
@@ -28,3 +54,70 @@ def build_permutation_matrix(size: int, perm: str) -> torch.Tensor:
     indices = torch.tensor([list(range(size)), [(perm_dict.get(i, i)) for i in range(size)]], dtype=torch.int64)
     values = torch.tensor([1] * size, dtype=torch.int64)
     return torch.sparse_coo_tensor(indices=indices, values=values, size=(size, size), dtype=torch.int64).coalesce()
+
+
+def pack_state(states: torch.Tensor) -> torch.Tensor:
+    """
+    Pack states, whose last dimension holds colors from 0 to 7, into 3 bits per facelet.
+    The output is a uint8 tensor whose last dimension holds ceil(3 * length / 8) bytes, bits being
+    stored from least to most significant, facelet after facelet.
+    """
+    bits = (states.to(dtype=torch.int64).unsqueeze(-1) >> torch.arange(BITS_PER_FACELET, device=states.device)) & 1
+    bits = bits.flatten(start_dim=-2)
+    bits = torch.nn.functional.pad(bits, (0, -bits.shape[-1] % 8))
+    packed = (bits.unflatten(-1, (-1, 8)) << torch.arange(8, device=states.device)).sum(dim=-1)
+    return packed.to(dtype=torch.uint8)
+
+
+def unpack_state(packed: torch.Tensor, length: int) -> torch.Tensor:
+    """
+    Unpack states packed by "pack_state" into int64 colors, given the number of facelets of a state.
+    """
+    bits = (packed.to(dtype=torch.int64).unsqueeze(-1) >> torch.arange(8, device=packed.device)) & 1
+    bits = bits.flatten(start_dim=-2)[..., : BITS_PER_FACELET * length]
+    shifts = torch.arange(BITS_PER_FACELET, device=packed.device)
+    return (bits.unflatten(-1, (length, BITS_PER_FACELET)) << shifts).sum(dim=-1)
+
+
+def _to_int64(value: int) -> int:
+    """
+    Convert an unsigned 64-bit integer into the signed integer of same bits.
+    """
+    return value - 2**64 if value >= 2**63 else value
+
+
+def _shift_right(values: torch.Tensor, shift: int) -> torch.Tensor:
+    """
+    Logical right shift of int64 values, whose bits are seen as unsigned.
+    """
+    return (values >> shift) & ((1 << (64 - shift)) - 1)
+
+
+def _mix64(values: torch.Tensor) -> torch.Tensor:
+    """
+    Scramble the bits of int64 values with the finalizer of the splitmix64 generator, relying on
+    products wrapping around modulo 2**64.
+    """
+    values = values + _to_int64(0x9E3779B97F4A7C15)
+    values = (values ^ _shift_right(values, 30)) * _to_int64(0xBF58476D1CE4E5B9)
+    values = (values ^ _shift_right(values, 27)) * _to_int64(0x94D049BB133111EB)
+    return values ^ _shift_right(values, 31)
+
+
+def hash_states(states: torch.Tensor) -> torch.Tensor:
+    """
+    Compute a 64-bit hash of states along their last dimension, as an int64 tensor.
+    Colors are weighted by pseudo-random 64-bit weights, one per facelet, and their sum is scrambled.
+    """
+    weights = _mix64(torch.arange(states.shape[-1], dtype=torch.int64, device=states.device))
+    return _mix64((states.to(dtype=torch.int64) * weights).sum(dim=-1))
+
+
+def hash_canonical_states(states: torch.Tensor, rotations: torch.Tensor) -> torch.Tensor:
+    """
+    Compute a 64-bit hash of states along their last dimension which is the same for all orientations
+    of a cube, being the least hash of the states obtained by the whole-cube rotations returned by
+    "build_rotations_tensor". Colors are not relabeled, so that hashes only identify a cube seen from
+    several orientations, unlike the classes of symmetric states of "symmetry.canonicalize_states".
+    """
+    return hash_states(states[..., rotations]).min(dim=-1).values
@@ -0,0 +1,84 @@
+from functools import lru_cache
+
+import torch
+
+from rubik.action import build_rotations_tensor
+from rubik.cache import load_actions_tensor
+from rubik.state import BITS_PER_FACELET, build_cube_tensor
+
+
+# a reflection mapping X coordinates to size - 1 - X swaps Left and Right faces
+REFLECTED_FACES = [0, 3, 2, 1, 4, 5]
+FACELETS_PER_WORD = 20
+
+
+def build_reflection_permutation(size: int) -> torch.Tensor:
+    """
+    Build the permutation of facelets of the reflection of a cube through the plane orthogonal to X axis.
+    """
+    tensor = build_cube_tensor(size)
+    (faces, x, y, z) = tensor.indices()
+    positions = torch.full((6, size, size, size), -1, dtype=torch.int64)
+    positions[faces, x, y, z] = torch.arange(len(faces))
+    return positions[torch.tensor(REFLECTED_FACES)[faces], size - 1 - x, y, z]
+
+
+@lru_cache(maxsize=16)
+def build_symmetries(size: int, reflections: bool = True) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Build the symmetries of a cube of a given size, that is the 24 whole-cube rotations, along with
+    the 24 rotations combined with a reflection if "reflections" is enabled. A symmetry is given by a
+    permutation of facelets, and by the relabeling of colors bringing the initial state back to itself
+    once permuted, so that the symmetric of any state is reached by as many moves. The output is a pair
+    of tensors of shape (G, 6 * size**2) and (G, 7), the first symmetry being identity.
+    """
+    permutations = build_rotations_tensor(load_actions_tensor(size))
+    if reflections:
+        # rotations followed by a reflection are all the other symmetries
+        permutations = torch.cat([permutations, permutations[:, build_reflection_permutation(size)]])
+
+    initial = build_cube_tensor(size).values()
+    relabelings = torch.zeros(len(permutations), 7, dtype=torch.int64)
+    relabelings.scatter_(1, initial[permutations], initial.expand(len(permutations), -1))
+    return (permutations, relabelings)
+
+
+def apply_symmetries(states: torch.Tensor, permutations: torch.Tensor, relabelings: torch.Tensor) -> torch.Tensor:
+    """
+    Map states stacked along the last dimension to their symmetrics, as a tensor of shape (..., G, 6 * size**2).
+    """
+    symmetrics = states.to(dtype=torch.int64)[..., permutations]
+    return relabelings[torch.arange(len(permutations)).unsqueeze(-1), symmetrics]
+
+
+def pack_words(states: torch.Tensor) -> torch.Tensor:
+    """
+    Pack colors of states stacked along the last dimension into int64 words of 20 facelets each, the first
+    facelet being the most significant, so that words compare like states in lexicographic order.
+    """
+    states = torch.nn.functional.pad(states.to(dtype=torch.int64), (0, -states.shape[-1] % FACELETS_PER_WORD))
+    shifts = BITS_PER_FACELET * torch.arange(FACELETS_PER_WORD - 1, -1, -1, device=states.device)
+    return (states.unflatten(-1, (-1, FACELETS_PER_WORD)) << shifts).sum(dim=-1)
+
+
+def canonicalize_states(states: torch.Tensor, size: int, reflections: bool = True) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Map states stacked along the last dimension to the canonical representatives of their classes of
+    symmetric states, being their lexicographically least symmetric. Also return the index of the symmetry
+    leading to each representative, so that states sharing a representative are reached by as many moves
+    and caches can store a single entry per class.
+    Colors being relabeled, classes gather states whose scrambles are symmetric, which differs from the
+    classes of "state.hash_canonical_states", gathering the orientations of a single cube.
+    """
+    (permutations, relabelings) = build_symmetries(size, reflections)
+    symmetrics = apply_symmetries(states, permutations.to(states.device), relabelings.to(states.device))
+    words = pack_words(symmetrics)  # size = (..., G, W)
+
+    # keep the symmetrics holding the least word, one word after the other
+    candidates = torch.ones(words.shape[:-1], dtype=torch.bool, device=states.device)
+    for word in words.unbind(dim=-1):
+        word = torch.where(candidates, word, torch.iinfo(torch.int64).max)
+        candidates &= word == word.min(dim=-1, keepdim=True).values
+    indices = candidates.to(dtype=torch.int64).argmax(dim=-1)
+    representatives = torch.gather(symmetrics, -2, indices[..., None, None].expand(*indices.shape, 1, states.shape[-1]))
+    return (representatives.squeeze(-2), indices)
@@ -0,0 +1,16 @@
+from typing import Iterator
+
+import pytest
+
+from rubik.cache import CACHE_DIR_ENV
+
+
+@pytest.fixture(autouse=True, scope="session")
+def cache_dir(tmp_path_factory: pytest.TempPathFactory) -> Iterator[str]:
+    """
+    Store tables cached by tests into a temporary directory rather than the user cache directory.
+    """
+    path = str(tmp_path_factory.mktemp("cache"))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv(CACHE_DIR_ENV, path)
+        yield path
@@ -4,13 +4,28 @@ from typing import Iterable
 import torch
 
 from rubik.action import (
+    CompactActions,
+    SparseChanges,
     POS_ROTATIONS,
     POS_SHIFTS,
     FACE_ROTATIONS,
+    FACE_PERMUTATIONS,
     build_actions_tensor,
     build_action_permutation,
+    build_changes_tensor,
+    build_rotations_tensor,
+    build_successor_table,
+    canonicalize_actions,
+    compose_actions,
+    decode_actions,
+    encode_actions,
+    format_actions_str,
+    get_index_dtype,
     parse_action_str,
     parse_actions_str,
+    parse_actions_tensor,
+    reduce_permutations,
+    sample_actions,
     sample_actions_str,
 )
 
@@ -91,6 +106,14 @@ def test_face_rotation(axis: int, input: Iterable[int], expected: Iterable[int])
     assert torch.equal(out, exp), f"Face rotation tensor is incorrect along axis {axis}: {out} != {exp}"
 
 
+def test_face_permutations():
+    """
+    Test that FACE_PERMUTATIONS matches FACE_ROTATIONS.
+    """
+    expected = FACE_ROTATIONS.to_dense().argmax(dim=-1).tolist()
+    assert expected == FACE_PERMUTATIONS, f"Face permutations expected '{expected}', got '{FACE_PERMUTATIONS}'"
+
+
 @pytest.mark.parametrize("size", [2, 3, 5, 20])
 def test_build_actions_tensor_shape(size: int):
     """
@@ -103,6 +126,92 @@ def test_build_actions_tensor_shape(size: int):
     )
 
 
+@pytest.mark.parametrize("size", range(2, 11))
+def test_build_actions_tensor_content(size: int):
+    """
+    Test that "build_actions_tensor" output matches permutations computed one move at a time.
+    """
+    expected = torch.tensor(
+        [
+            [[build_action_permutation(size, axis, slice, inverse) for inverse in range(2)] for slice in range(size)]
+            for axis in range(3)
+        ],
+        dtype=torch.int64,
+    )
+    observed = build_actions_tensor(size)
+    assert torch.equal(expected, observed), f"'build_actions_tensor' output is incorrect for size {size}"
+
+
+@pytest.mark.parametrize("size", [2, 3, 4, 7])
+def test_build_changes_tensor(size: int):
+    """
+    Test that "build_changes_tensor" output has the same effect as the actions it is built from,
+    holding only the positions they change.
+    """
+    actions = build_actions_tensor(size)
+    expected = int((actions != torch.arange(actions.shape[-1])).sum())
+    observed = build_changes_tensor(actions).shape[-1]
+    assert expected == observed, f"'build_changes_tensor' holds {observed} pairs instead of {expected}"
+
+    changes = SparseChanges.from_actions(actions)
+    state = torch.randint(1, 7, (actions.shape[-1],))
+    for axis in range(3):
+        for slice in range(size):
+            for inverse in range(2):
+                destinations, sources = changes[axis, slice, inverse]
+                observed = state.clone()
+                observed[destinations] = observed[sources]
+                expected = torch.gather(state, 0, actions[axis, slice, inverse])
+                assert torch.equal(expected, observed), (
+                    f"'build_changes_tensor' output is incorrect for move {(axis, slice, inverse)}"
+                )
+
+
+@pytest.mark.parametrize(
+    "length, expected",
+    [
+        (24, torch.uint8),
+        (256, torch.uint8),
+        (257, torch.int16),
+        (60000, torch.int32),
+    ],
+)
+def test_get_index_dtype(length: int, expected: torch.dtype):
+    """
+    Test that "get_index_dtype" returns the narrowest dtype fitting positions.
+    """
+    observed = get_index_dtype(length)
+    assert expected == observed, f"'get_index_dtype' output is incorrect: expected '{expected}', got '{observed}'"
+
+
+@pytest.mark.parametrize("size", [2, 3, 7, 10])
+def test_compact_actions(size: int):
+    """
+    Test that "CompactActions" is indexed like the tensor of actions it is built from, with less memory.
+    """
+    actions = build_actions_tensor(size)
+    compact = CompactActions.from_actions(actions)
+    assert compact.shape == actions.shape, f"'CompactActions' has incorrect shape {compact.shape}"
+    assert compact.nbytes * 8 <= actions.nbytes, (
+        f"'CompactActions' uses {compact.nbytes} bytes, against {actions.nbytes} bytes for the tensor of actions"
+    )
+    for axis in range(3):
+        for slice in range(size):
+            for inverse in range(2):
+                assert torch.equal(compact[axis, slice, inverse], actions[axis, slice, inverse]), (
+                    f"'CompactActions' output is incorrect for move {(axis, slice, inverse)}"
+                )
+
+    (axes, slices, inverses) = (
+        torch.tensor([0, 1, 2, 2]),
+        torch.tensor([0, size - 1, 1, 0]),
+        torch.tensor([0, 1, 1, 0]),
+    )
+    observed = compact[axes, slices, inverses]
+    expected = actions[axes, slices, inverses]
+    assert torch.equal(expected, observed), "'CompactActions' output is incorrect for batched moves"
+
+
 @pytest.mark.parametrize(
     "size, axis, slice, inverse",
     [
@@ -159,6 +268,50 @@ def test_parse_actions_str(moves: str, expected: tuple[int, int, int]):
     )
 
 
+@pytest.mark.parametrize("moves", ["X1 Y", "X1 A2", "X1 (Y0)"])
+def test_parse_actions_str_invalid(moves: str):
+    """
+    Test that "parse_actions_str" raises a clear error on invalid moves.
+    """
+    with pytest.raises(ValueError, match="Invalid move"):
+        parse_actions_str(moves)
+
+
+def test_parse_actions_str_out_of_bounds():
+    """
+    Test that "parse_actions_str" raises a clear error on slices exceeding the cube size.
+    """
+    assert parse_actions_str("X0 Y2i", size=3) == [(0, 0, 0), (1, 2, 1)], "'parse_actions_str' output is incorrect"
+    with pytest.raises(ValueError, match="'Y3i' is out of bounds for a cube of size 3"):
+        parse_actions_str("X0 Y3i", size=3)
+
+
+@pytest.mark.parametrize("moves", ["", "X1", "  X1 Y0 X25i Z512ijk Z30 Y5i "])
+def test_parse_actions_tensor(moves: str):
+    """
+    Test that "parse_actions_tensor" agrees with "parse_actions_str", and "format_actions_str" reverts it.
+    """
+    observed = parse_actions_tensor(moves)
+    expected = torch.tensor(parse_actions_str(moves), dtype=torch.int64).reshape(-1, 3)
+    assert torch.equal(expected, observed), "'parse_actions_tensor' output is incorrect"
+    assert format_actions_str(observed) == " ".join(moves.split()).replace("ijk", "i"), (
+        "'format_actions_str' output is incorrect"
+    )
+
+
+@pytest.mark.parametrize("num_moves, size", [[0, 3], [100, 3], [100, 42], [100, 43], [1000, 1000]])
+def test_encode_actions(num_moves: int, size: int):
+    """
+    Test that "decode_actions" reverts "encode_actions", using one byte per move up to size 42.
+    """
+    actions = sample_actions(num_moves, size)
+    data = encode_actions(actions, size)
+    if size <= 42:
+        assert len(data) == num_moves, f"'encode_actions' uses {len(data)} bytes for {num_moves} moves"
+    observed = decode_actions(data, size)
+    assert torch.equal(actions, observed), "'decode_actions' output is incorrect"
+
+
 @pytest.mark.parametrize(
     "num_moves, size, seed",
     [
@@ -177,3 +330,117 @@ def test_sample_actions_str(num_moves: int, size: int, seed: int):
 
     parsed = parse_actions_str(moves_1)
     assert len(parsed) == len(moves_1.split()), "'sample_actions_str' output cannot be parsed correctly"
+
+
+@pytest.mark.parametrize("num_moves, size, seed", [[0, 3, 0], [1, 20, 42], [256, 5, 21]])
+def test_sample_actions(num_moves: int, size: int, seed: int):
+    """
+    Test that "sample_actions" samples the same moves as "sample_actions_str".
+    """
+    expected = parse_actions_str(sample_actions_str(num_moves, size, seed))
+    observed = [tuple(action) for action in sample_actions(num_moves, size, seed).tolist()]
+    assert expected == observed, "'sample_actions' disagrees with 'sample_actions_str'"
+
+
+@pytest.mark.parametrize("num_permutations", [1, 2, 7, 64])
+def test_reduce_permutations(num_permutations: int):
+    """
+    Test that "reduce_permutations" combines permutations in order.
+    """
+    permutations = torch.stack([torch.randperm(20) for _ in range(num_permutations)])
+    expected = permutations[0]
+    for permutation in permutations[1:]:
+        expected = torch.gather(expected, 0, permutation)
+    observed = reduce_permutations(permutations)
+    assert torch.equal(expected, observed), "'reduce_permutations' output is incorrect"
+
+
+@pytest.mark.parametrize("max_length", [54, 0])
+@pytest.mark.parametrize("num_moves, max_numel", [[0, 2**24], [1, 2**24], [100, 2**24], [100, 540]])
+def test_compose_actions(num_moves: int, max_numel: int, max_length: int):
+    """
+    Test that "compose_actions" combines moves in order, with balanced reductions or sequential gathers.
+    """
+    actions = build_actions_tensor(3)
+    moves = sample_actions(num_moves, 3)
+    expected = torch.arange(actions.shape[-1])
+    for axis, slice, inverse in moves.tolist():
+        expected = torch.gather(expected, 0, actions[axis, slice, inverse])
+    observed = compose_actions(actions, moves, max_numel, max_length)
+    assert torch.equal(expected, observed), "'compose_actions' output is incorrect"
+
+
+@pytest.mark.parametrize(
+    "moves, expected",
+    [
+        ["", ""],
+        ["X0 X0i", ""],
+        ["X0 X0 X0 X0", ""],
+        ["X0 X0 X0", "X0i"],
+        ["X0i X0i", "X0 X0"],
+        ["X2 X0 X1i", "X0 X1i X2"],
+        ["X1 X0 X1 Y0 Y0i X1", "X0 X1i"],
+        ["Z0 Y1 Z0i Y1i", "Z0 Y1 Z0i Y1i"],
+    ],
+)
+def test_canonicalize_actions(moves: str, expected: str):
+    """
+    Test that "canonicalize_actions" behaves as expected.
+    """
+    observed = canonicalize_actions(parse_actions_str(moves))
+    assert parse_actions_str(expected) == observed, (
+        f"'canonicalize_actions' output is incorrect: expected '{expected}', got '{observed}' instead"
+    )
+
+
+@pytest.mark.parametrize("size, seed", [[2, 0], [3, 1], [4, 2]])
+def test_canonicalize_actions_effect(size: int, seed: int):
+    """
+    Test that "canonicalize_actions" preserves the effect of moves, and outputs sequences accepted by the
+    automaton of "build_successor_table".
+    """
+    actions = build_actions_tensor(size)
+    moves = parse_actions_str(sample_actions_str(200, size, seed))
+    canonical = canonicalize_actions(moves)
+    expected = compose_actions(actions, torch.tensor(moves))
+    observed = compose_actions(actions, torch.tensor(canonical, dtype=torch.int64).reshape(-1, 3))
+    assert torch.equal(expected, observed), "'canonicalize_actions' changes the effect of moves"
+
+    table = build_successor_table(size)
+    state = 0
+    for axis, slice, inverse in canonical:
+        state = int(table[state, (axis * size + slice) * 2 + inverse])
+        assert state >= 0, "'canonicalize_actions' output is rejected by 'build_successor_table'"
+
+
+@pytest.mark.parametrize("size, seed", [[2, 0], [3, 1]])
+def test_build_successor_table(size: int, seed: int):
+    """
+    Test that sequences accepted by the automaton of "build_successor_table" are in normal form.
+    """
+    table = build_successor_table(size)
+    generator = torch.Generator().manual_seed(seed)
+    moves = [(axis, slice, inverse) for axis in range(3) for slice in range(size) for inverse in range(2)]
+    for _ in range(20):
+        (state, sequence) = (0, [])
+        for _ in range(30):
+            candidates = (table[state] >= 0).nonzero().reshape(-1)
+            move = int(candidates[torch.randint(len(candidates), (1,), generator=generator)])
+            (state, sequence) = (int(table[state, move]), sequence + [moves[move]])
+        assert canonicalize_actions(sequence) == sequence, (
+            "'build_successor_table' accepts sequences not in normal form"
+        )
+
+
+@pytest.mark.parametrize("size", [2, 3, 4])
+def test_build_rotations_tensor(size: int):
+    """
+    Test that "build_rotations_tensor" outputs the 24 distinct whole-cube rotations, closed under composition.
+    """
+    rotations = build_rotations_tensor(build_actions_tensor(size))
+    keys = {tuple(rotation.tolist()) for rotation in rotations}
+    assert rotations.shape == (24, 6 * size**2), f"'build_rotations_tensor' has incorrect shape {rotations.shape}"
+    assert len(keys) == 24, "'build_rotations_tensor' outputs duplicate rotations"
+    assert torch.equal(rotations[0], torch.arange(6 * size**2)), "'build_rotations_tensor' does not start with identity"
+    for rotation in rotations:
+        assert {tuple(r.tolist()) for r in rotation[rotations]} == keys, "'build_rotations_tensor' is not closed"
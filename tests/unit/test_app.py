@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import gradio as gr
+import pytest
+
+from rubik.cube import Cube
+from rubik.interface.app import Callbacks, dumps, loads
+
+
+def progress(*args, **kwargs) -> None:
+    """
+    Ignore progress updates of callbacks run outside of an interface.
+    """
+    return
+
+
+class TestCallbacks:
+    """
+    A testing class for the Callbacks class.
+    """
+
+    def test_callbacks(self):
+        """
+        Test that callbacks create, scramble, rotate and display the cube of a session.
+        """
+        callbacks = Callbacks()
+
+        async def run_session():
+            (data, cube_visualizer) = await callbacks.create(3, progress=progress)
+            data = await callbacks.scramble(20, data, cube_visualizer, progress=progress)
+            data = await callbacks.rotate("X0 Y1i", data, cube_visualizer)
+            return (data, cube_visualizer, await callbacks.display(data, cube_visualizer, progress=progress))
+
+        (data, cube_visualizer, figure) = asyncio.run(run_session())
+        cube = Cube(3)
+        cube.scramble(20, seed=0)
+        cube.rotate("X0 Y1i")
+        assert loads(data).state.equal(cube.state), "callbacks 'scramble' and 'rotate' output is incorrect"
+
+        expected = list(cube_visualizer.fork()(cube.coordinates, cube.state, 3).data[-1].facecolor)
+        assert list(figure.data[-1].facecolor) == expected, "callback 'display' output is incorrect"
+        assert cube_visualizer is not callbacks.pool.get("visualizer", 3), "callback 'create' shares its visualizer"
+
+    def test_display_concurrent(self):
+        """
+        Test that concurrent displays of a session leave its figure consistent with the last displayed state.
+        """
+        callbacks = Callbacks(num_workers=8)
+        cube = Cube(4)
+        cube_visualizer = callbacks.pool.get("visualizer", 4).fork()
+        datas = []
+        for num_moves in range(16):
+            cube.scramble(1, seed=num_moves)
+            datas.append(dumps(cube))
+
+        async def display_all():
+            await asyncio.gather(*[callbacks.display(data, cube_visualizer, progress=progress) for data in datas])
+
+        asyncio.run(display_all())
+        state = cube_visualizer.displayed_state
+        expected = list(cube_visualizer.fork()(cube.coordinates, state, 4).data[-1].facecolor)
+        assert list(cube_visualizer.figure.data[-1].facecolor) == expected, "concurrent displays corrupt the figure"
+
+    def test_run_timeout(self):
+        """
+        Test that callbacks fail once their work takes longer than the timeout.
+        """
+        callbacks = Callbacks(timeout=0.05)
+        with pytest.raises(gr.Error):
+            asyncio.run(callbacks.run(2, time.sleep, 0.5))
+
+    @pytest.mark.parametrize("size, prefix", [[2, "rubik_"], [3, "rubik-heavy_"]])
+    def test_run_executors(self, size: int, prefix: str):
+        """
+        Test that the work of cubes larger than "heavy_size" runs in the pool of heavy workers.
+        """
+        callbacks = Callbacks(heavy_size=2)
+        name = asyncio.run(callbacks.run(size, lambda: threading.current_thread().name))
+        assert name.startswith(prefix), f"method 'run' runs the work of cubes of size {size} in thread {name}"
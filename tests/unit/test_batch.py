@@ -0,0 +1,60 @@
+import pytest
+
+import torch
+
+from rubik.action import parse_actions_str, sample_actions_str
+from rubik.batch import CubeBatch
+from rubik.cube import Cube
+
+
+class TestCubeBatch:
+    """
+    A testing class for the CubeBatch class.
+    """
+
+    @pytest.mark.parametrize("size, num_cubes", [[2, 1], [3, 16], [5, 7]])
+    def test__init__(self, size: int, num_cubes: int):
+        """
+        Test that the __init__ method produce expected attributes.
+        """
+        batch = CubeBatch(size, num_cubes)
+        assert len(batch) == num_cubes, f"batch has incorrect length {len(batch)}"
+        assert batch.states.shape == (num_cubes, 6 * (size**2)), f"'states' has incorrect shape {batch.states.shape}"
+        assert torch.equal(batch.states[0], Cube(size).state), "'states' are not solved"
+
+    @pytest.mark.parametrize("moves", ["X2 X1i Y1i Z1i Y0 Z0i X2 X1i Y1i Z1i Y0 Z0i"])
+    def test_rotate_shared(self, moves: str):
+        """
+        Test that the .rotate method applies a shared sequence of moves like Cube.rotate does.
+        """
+        batch = CubeBatch(3, 4)
+        batch.rotate(moves)
+        cube = Cube(3)
+        cube.rotate(moves)
+        for state in batch.states:
+            assert torch.equal(state, cube.state), "method 'rotate' disagrees with Cube.rotate"
+
+    @pytest.mark.parametrize("size, num_cubes, num_moves", [[3, 8, 20], [4, 5, 50]])
+    def test_rotate_per_cube(self, size: int, num_cubes: int, num_moves: int):
+        """
+        Test that the .rotate method applies one sequence of moves per cube like Cube.rotate does.
+        """
+        moves = [sample_actions_str(num_moves, size, seed=seed) for seed in range(num_cubes)]
+        batch = CubeBatch(size, num_cubes)
+        batch.rotate(moves)
+        for state, sequence in zip(batch.states, moves):
+            cube = Cube(size)
+            cube.rotate(sequence)
+            assert torch.equal(state, cube.state), "method 'rotate' disagrees with Cube.rotate"
+
+    def test_rotate_once(self):
+        """
+        Test that the .rotate_once method applies one move per cube.
+        """
+        actions = parse_actions_str("X0 Y1i Z2")
+        batch = CubeBatch(3, len(actions))
+        batch.rotate_once(*torch.tensor(actions).unbind(dim=-1))
+        for state, action in zip(batch.states, actions):
+            cube = Cube(3)
+            cube.rotate_once(*action)
+            assert torch.equal(state, cube.state), "method 'rotate_once' disagrees with Cube.rotate_once"
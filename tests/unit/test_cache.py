@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import pytest
+
+import torch
+
+from rubik.action import build_actions_tensor, build_changes_tensor
+from rubik.cache import (
+    get_cache_dir,
+    get_table_path,
+    load_actions_tensor,
+    load_changes_tensor,
+    read_table,
+    save_table,
+    warmup_cache,
+)
+
+
+def test_get_cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that "get_cache_dir" honors the supplied directory and the environment variable.
+    """
+    monkeypatch.setenv("RUBIK_CACHE_DIR", str(tmp_path / "env"))
+    assert get_cache_dir() == tmp_path / "env", "'get_cache_dir' ignores the RUBIK_CACHE_DIR environment variable"
+    assert get_cache_dir(tmp_path) == tmp_path, "'get_cache_dir' ignores the supplied directory"
+
+
+@pytest.mark.parametrize("name", ["actions", "changes"])
+@pytest.mark.parametrize("size", [2, 3, 5])
+def test_read_table(tmp_path: Path, name: str, size: int):
+    """
+    Test that "read_table" builds, stores and reloads tables.
+    """
+    expected = build_actions_tensor(size)
+    if name == "changes":
+        expected = build_changes_tensor(expected)
+
+    observed = read_table(name, size, tmp_path)
+    assert get_table_path(name, size, tmp_path).exists(), "'read_table' does not store missing tables"
+    assert torch.equal(observed, expected), "'read_table' output is incorrect"
+
+    observed = read_table(name, size, tmp_path)
+    assert torch.equal(observed, expected), "'read_table' cached output is incorrect"
+
+
+def test_read_table_corrupted(tmp_path: Path):
+    """
+    Test that "read_table" rebuilds tables failing the checksum validation.
+    """
+    path = save_table("actions", 3, tmp_path)
+    with open(path, "r+b") as file:
+        file.seek(-8, 2)
+        file.write(bytes([255] * 8))
+
+    observed = read_table("actions", 3, tmp_path)
+    assert torch.equal(observed, build_actions_tensor(3)), "'read_table' does not rebuild corrupted tables"
+
+
+def test_load_table(tmp_path: Path):
+    """
+    Test that loaded tables are shared across calls.
+    """
+    actions_1 = load_actions_tensor(4, tmp_path)
+    actions_2 = load_actions_tensor(4, tmp_path)
+    assert actions_1 is actions_2, "'load_actions_tensor' does not reuse tables kept in memory"
+
+    changes_1 = load_changes_tensor(4, tmp_path)
+    changes_2 = load_changes_tensor(4, tmp_path)
+    assert changes_1 is changes_2, "'load_changes_tensor' does not reuse tables kept in memory"
+
+
+def test_load_table_env(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that loaded tables follow changes of the RUBIK_CACHE_DIR environment variable.
+    """
+    for name in ["first", "second"]:
+        monkeypatch.setenv("RUBIK_CACHE_DIR", str(tmp_path / name))
+        load_actions_tensor(2)
+        assert get_table_path("actions", 2, tmp_path / name).exists(), "'load_table' ignores the new cache directory"
+
+
+def test_warmup_cache(tmp_path: Path):
+    """
+    Test that "warmup_cache" stores tables for all sizes of the range.
+    """
+    warmup_cache(2, 4, str(tmp_path))
+    for size in range(2, 5):
+        for name in ["actions", "changes"]:
+            assert get_table_path(name, size, tmp_path).exists(), f"'warmup_cache' does not store {name} of size {size}"
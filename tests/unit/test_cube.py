@@ -2,7 +2,9 @@ import pytest
 
 import torch
 
+from rubik.action import sample_actions_str
 from rubik.cube import Cube
+from rubik.permutation import permutation_order
 
 
 class TestCube:
@@ -51,6 +53,18 @@ class TestCube:
         assert cube.history == [], "method 'shuffle' does not flush content"
         assert not torch.equal(cube_state, cube.state), "method 'shuffle' does not change state"
 
+    @pytest.mark.parametrize("size, num_moves, seed", [[3, 50, 42], [4, 1000, 0], [7, 0, 1]])
+    def test_scramble_matches_rotate(self, size: int, num_moves: int, seed: int):
+        """
+        Test that the .scramble method matches the rotation of sampled moves.
+        """
+        cube = Cube(size)
+        cube.scramble(num_moves, seed, keep_history=True)
+        expected = Cube(size)
+        expected.rotate(sample_actions_str(num_moves, size, seed))
+        assert torch.equal(expected.state, cube.state), "method 'scramble' disagrees with method 'rotate'"
+        assert expected.history == cube.history, "method 'scramble' does not record sampled moves"
+
     @pytest.mark.parametrize(
         "moves",
         [
@@ -68,6 +82,7 @@ class TestCube:
         assert cube.history != [], "method 'rotate' does not update history"
         assert not torch.equal(cube_state, cube.state), "method 'rotate' does not change state"
 
+    @pytest.mark.parametrize("sparse", [False, True])
     @pytest.mark.parametrize(
         "axis, slice, inverse",
         [
@@ -76,16 +91,20 @@ class TestCube:
             [2, 0, 0],
         ],
     )
-    def test_rotate_once(self, axis: int, slice: int, inverse: int):
+    def test_rotate_once(self, axis: int, slice: int, inverse: int, sparse: bool):
         """
         Test that the .rotate_once method behaves as expected.
         """
         cube = Cube(3)
         cube_state = cube.state.clone()
-        cube.rotate_once(axis, slice, inverse)
+        cube.rotate_once(axis, slice, inverse, sparse=sparse)
         assert cube.history == [(axis, slice, inverse)], "method 'rotate_once' does not update history"
         assert not torch.equal(cube_state, cube.state), "method 'rotate_once' does not change state"
 
+        expected = torch.gather(cube_state, 0, cube.actions[axis, slice, inverse])
+        assert torch.equal(expected, cube.state), "method 'rotate_once' disagrees with the actions tensor"
+
+    @pytest.mark.parametrize("size", [3, 8])
     @pytest.mark.parametrize(
         "moves",
         [
@@ -93,11 +112,11 @@ class TestCube:
             "X2 X1i Y1i Z1i Y0 Z0i X2 X1i Y1i Z1i Y0 Z0i " * 2,
         ],
     )
-    def test_compose_moves(self, moves: str):
+    def test_compose_moves(self, moves: str, size: int):
         """
-        Test that the .compose_moves method behaves as expected.
+        Test that the .compose_moves method behaves as expected, on either side of BALANCED_MAX_LENGTH.
         """
-        cube = Cube(3)
+        cube = Cube(size)
 
         # apply changes induced by moves using the permutation dict returned by 'compute_changes'
         changes = cube.compose_moves(moves)
@@ -110,6 +129,151 @@ class TestCube:
         # assert the tow are identical
         assert torch.equal(expected, observed), "method 'compute_changes' does not behave correctly: "
 
+    def test_compose_moves_cache(self):
+        """
+        Test that the .compose_moves method reuses cached sequences and prefixes.
+        """
+        cube = Cube(3)
+        changes = cube._compose_moves("X2 X1i Y1i")
+        assert cube._compose_moves(" X2  X1i Y1i ") is changes, "method 'compose_moves' does not cache results"
+
+        observed = cube.compose_moves("X2 X1i Y1i Z1i Y0")
+        expected = Cube(3, cache=False).compose_moves("X2 X1i Y1i Z1i Y0")
+        assert torch.equal(expected, observed), "method 'compose_moves' is incorrect when reusing a cached prefix"
+
+    def test_compose_moves_copy(self):
+        """
+        Test that modifying the output of the .compose_moves method leaves cached results unchanged.
+        """
+        cube = Cube(3)
+        expected = cube.compose_moves("X2 X1i Y1i").clone()
+        cube.compose_moves("X2 X1i Y1i").zero_()
+        observed = cube.compose_moves("X2 X1i Y1i")
+        assert torch.equal(expected, observed), "method 'compose_moves' exposes its cached results"
+
+    def test_register_macro(self):
+        """
+        Test that macros registered with the .register_macro method can be used in .rotate and .compose_moves.
+        """
+        cube = Cube(3)
+        cube.register_macro("sexy", "X2 Y0 X2i Y0i")
+        cube.register_macro("twice", "sexy sexy")
+        cube.rotate("twice Z1 sexy")
+
+        expected = Cube(3)
+        expected.rotate("X2 Y0 X2i Y0i X2 Y0 X2i Y0i Z1 X2 Y0 X2i Y0i")
+        assert torch.equal(expected.state, cube.state), "method 'rotate' does not apply macros correctly"
+        assert expected.history == cube.history, "method 'rotate' does not record macros in history"
+        assert torch.equal(expected.compose_moves("X2 Y0 X2i Y0i Z1"), cube.compose_moves("sexy Z1")), (
+            "method 'compose_moves' does not expand macros correctly"
+        )
+
+    @pytest.mark.parametrize(
+        "moves, expanded, exponent",
+        [
+            ["(X0 Y1)^3", "X0 Y1 X0 Y1 X0 Y1", None],
+            ["Z1 (X0 Y1) ^ 2 X2i (Y0)^5", "Z1 X0 Y1 X0 Y1 X2i Y0", None],
+            ["(X0 Y1)^-1", "X0 Y1", -1],
+            ["(X0 Y1)^1000000", "X0 Y1", 1000000],
+        ],
+    )
+    def test_rotate_repeat(self, moves: str, expanded: str, exponent: int | None):
+        """
+        Test that the .rotate and .compose_moves methods support repeated groups of moves.
+        """
+        if exponent is not None:
+            # the group is repeated the least number of times having the same effect
+            expanded = " ".join([expanded] * (exponent % permutation_order(Cube(3).compose_moves(expanded))))
+
+        cube = Cube(3)
+        cube.rotate(moves)
+        expected = Cube(3)
+        expected.rotate(expanded)
+        assert torch.equal(expected.state, cube.state), "method 'rotate' does not apply repeated groups correctly"
+        assert expected.history == cube.history, "method 'rotate' does not record repeated groups in history"
+        assert torch.equal(Cube(3).compose_moves(expanded), Cube(3).compose_moves(moves)), (
+            "method 'compose_moves' does not combine repeated groups correctly"
+        )
+
+    @pytest.mark.parametrize("name", ["X1", "Z0i", "two words", "(sexy)", "sexy^2", ""])
+    def test_register_macro_invalid(self, name: str):
+        """
+        Test that the .register_macro method rejects names that could be confused with moves.
+        """
+        with pytest.raises(ValueError):
+            Cube(3).register_macro(name, "X0")
+
+    @pytest.mark.parametrize("cache", [True, False])
+    def test_compact(self, cache: bool):
+        """
+        Test that cubes with compact actions behave like cubes with a tensor of actions.
+        """
+        moves = "X2 X1i Y1i Z1i Y0 Z0i X2 X1i Y1i Z1i Y0 Z0i"
+        cube = Cube(4, cache=cache)
+        compact_cube = Cube(4, cache=cache, compact=True)
+        assert torch.equal(cube.compose_moves(moves), compact_cube.compose_moves(moves)), (
+            "method 'compose_moves' behaves differently with compact actions"
+        )
+
+        cube.rotate(moves)
+        compact_cube.rotate(moves)
+        assert torch.equal(cube.state, compact_cube.state), "method 'rotate' behaves differently with compact actions"
+
+    @pytest.mark.parametrize("size", [2, 3, 6])
+    def test_facelets(self, size: int):
+        """
+        Test that the facelets property matches faces sliced from the dense 4D tensor.
+        """
+        cube = Cube(size)
+        cube.scramble(100)
+        tensor = torch.sparse_coo_tensor(cube.coordinates, cube.state, size=(6, size, size, size)).to_dense()
+        n = size - 1
+        faces = [
+            tensor[0, :, :, n].transpose(0, 1),
+            tensor[1, 0, :, :].flip(1).transpose(0, 1),
+            tensor[2, :, n, :].flip(1).transpose(0, 1),
+            tensor[3, n, :, :].flip(0).flip(1).transpose(0, 1),
+            tensor[4, :, 0, :].flip(0).flip(1).transpose(0, 1),
+            tensor[5, :, :, 0].flip(1).transpose(0, 1),
+        ]
+        expected = [[[cube.colors[i - 1] for i in row] for row in face.tolist()] for face in faces]
+        assert cube.facelets == expected, "property 'facelets' is incorrect"
+
+        space = " " * size
+        facelets = cube.facelets
+        l1 = "\n".join(" ".join([space, "".join(row), space, space]) for row in facelets[0])
+        l2 = "\n".join(" ".join("".join(face[i]) for face in facelets[1:5]) for i in range(size))
+        l3 = "\n".join(" ".join((space, "".join(row), space, space)) for row in facelets[-1])
+        assert str(cube) == "\n".join([l1, l2, l3]), "__str__ method output is incorrect"
+
+    def test_rotate_canonicalize(self):
+        """
+        Test that the .rotate method with canonicalization has the same effect, with fewer moves in history.
+        """
+        moves = "X2 X0 X0i X1 X1 X1 X1 Y0 (Z1 Z1i)^3 Y0i Y2i"
+        cube = Cube(3)
+        cube.rotate(moves)
+        canonical_cube = Cube(3)
+        canonical_cube.rotate(moves, canonicalize=True)
+        assert torch.equal(cube.state, canonical_cube.state), "method 'rotate' behaves differently when canonicalizing"
+        assert canonical_cube.history == [(0, 2, 0), (1, 2, 1)], "method 'rotate' history is not canonical"
+
+    @pytest.mark.parametrize("size", [2, 3, 7])
+    def test_save_load(self, tmp_path, size: int):
+        """
+        Test that the .save and .load methods restore the state, history and macros of a cube.
+        """
+        cube = Cube(size)
+        cube.register_macro("sexy", "X0 Y1 X0i Y1i")
+        cube.rotate(sample_actions_str(20, size, seed=size) + " sexy")
+        cube.save(tmp_path / "cube.npz")
+        loaded = Cube.load(tmp_path / "cube.npz")
+        assert loaded.size == size, f"method 'load' restores an incorrect size {loaded.size}"
+        assert torch.equal(cube.state, loaded.state), "method 'load' does not restore the state"
+        assert cube.history == loaded.history, "method 'load' does not restore the history"
+        assert cube.macros == loaded.macros, "method 'load' does not restore macros"
+        assert (tmp_path / "cube.npz").stat().st_size < 4096, "method 'save' output is not compact"
+
     def test__str__len(self):
         """
         Test that the __str__ method behaves as expected.
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import torch
+
+from rubik.batch import CubeBatch
+from rubik.dataset import RandomWalkDataset, ShardWriter, generate_dataset, read_shards
+
+
+def test_random_walk_dataset():
+    """
+    Test that "RandomWalkDataset" yields states reached by the yielded moves, never undoing the previous one.
+    """
+    dataset = RandomWalkDataset(3, num_cubes=8, max_depth=5, num_walks=2)
+    batch = CubeBatch(3, 8)
+    (steps, previous) = (list(dataset), torch.full((8,), -2))
+    assert len(steps) == 10, f"'RandomWalkDataset' yields {len(steps)} steps instead of 10"
+    for step, (states, depths, moves) in enumerate(steps):
+        if step % 5 == 0:
+            batch = CubeBatch(3, 8)
+        else:
+            assert not (moves == previous ^ 1).any(), "'RandomWalkDataset' undoes a move"
+        batch.rotate_once(moves // 6, moves // 2 % 3, moves % 2)
+        assert torch.equal(states.to(dtype=torch.int64), batch.states), "'RandomWalkDataset' states are incorrect"
+        assert (depths == step % 5 + 1).all(), "'RandomWalkDataset' depths are incorrect"
+        previous = moves
+
+
+def test_random_walk_dataset_seed():
+    """
+    Test that "RandomWalkDataset" walks are reproducible for a given seed and worker.
+    """
+    dataset = RandomWalkDataset(2, num_cubes=4, max_depth=3, num_walks=1, seed=1)
+    expected = [moves for _, _, moves in dataset.walk(1)]
+    observed = [moves for _, _, moves in dataset.walk(1)]
+    assert all(torch.equal(e, o) for e, o in zip(expected, observed)), "'RandomWalkDataset' is not reproducible"
+    others = [moves for _, _, moves in dataset.walk(0)]
+    assert not all(torch.equal(e, o) for e, o in zip(expected, others)), "'RandomWalkDataset' workers share walks"
+
+
+def test_shard_writer(tmp_path: Path):
+    """
+    Test that "ShardWriter" writes shards of bounded size, read back as written by "read_shards".
+    """
+    dataset = RandomWalkDataset(3, num_cubes=6, max_depth=4, num_walks=1)
+    steps = list(dataset)
+    with ShardWriter(tmp_path, shard_size=10) as writer:
+        for states, depths, moves in steps:
+            writer.write(states, depths, moves)
+    assert len(writer.paths) == 3, f"'ShardWriter' writes {len(writer.paths)} shards instead of 3"
+
+    shards = list(read_shards(tmp_path, 3))
+    for expected, observed in zip(
+        [torch.cat(tensors) for tensors in zip(*steps)], [torch.cat(s) for s in zip(*shards)]
+    ):
+        assert torch.equal(expected.to(dtype=torch.int64), observed), "'read_shards' output is incorrect"
+
+
+def test_shard_writer_empty(tmp_path: Path):
+    """
+    Test that "ShardWriter" writes no shard when no state is buffered.
+    """
+    with ShardWriter(tmp_path, shard_size=10) as writer:
+        writer.flush()
+    assert writer.paths == [] and not list(tmp_path.glob("*.npz")), "'ShardWriter' writes empty shards"
+
+
+def test_generate_dataset(tmp_path: Path):
+    """
+    Test that "generate_dataset" writes the walks of each worker.
+    """
+    generate_dataset(str(tmp_path), 2, num_walks=2, num_cubes=4, max_depth=3, num_workers=1)
+    (states, depths, moves) = (torch.cat(tensors) for tensors in zip(*read_shards(tmp_path, 2)))
+    assert states.shape == (24, 24), f"'generate_dataset' writes states of incorrect shape {states.shape}"
+    assert torch.equal(depths.unique(), torch.tensor([1, 2, 3])), "'generate_dataset' writes incorrect depths"
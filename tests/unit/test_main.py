@@ -0,0 +1,43 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from rubik.__main__ import main
+
+
+STARTUP_BUDGET = 0.5  # seconds
+HEAVY_MODULES = {"torch", "gradio", "plotly", "numpy"}
+
+
+def test_import_time():
+    """
+    Test that the command line entry point imports no heavy module, and within the startup budget.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import rubik.__main__"], capture_output=True, text=True, check=True
+    )
+    # lines read "import time: self [us] | cumulative [us] | module", submodules being indented, after a header
+    # line, while other lines such as warnings are skipped
+    timings = {}
+    lines = [
+        line.removeprefix("import time:") for line in result.stderr.splitlines() if line.startswith("import time:")
+    ]
+    for line in lines[1:]:
+        (_, cumulative, module) = line.split("|")
+        timings[module.strip()] = int(cumulative) / 1e6
+    imported = {module.split(".")[0] for module in timings}
+    assert not HEAVY_MODULES & imported, f"entry point imports heavy modules {HEAVY_MODULES & imported}"
+    observed = timings["rubik.__main__"]
+    assert observed < STARTUP_BUDGET, f"entry point takes {observed:.3f}s to import, beyond {STARTUP_BUDGET}s"
+
+
+def test_main(tmp_path: Path):
+    """
+    Test that "main" runs subcommands, and rejects unknown ones.
+    """
+    main(["warmup", "--min_size", "2", "--max_size", "2", "--cache_dir", str(tmp_path)])
+    assert len(list(tmp_path.glob("*/actions-2.npy"))), "'main' does not run the warmup subcommand"
+    with pytest.raises(SystemExit):
+        main(["unknown"])
@@ -0,0 +1,35 @@
+from rubik import metrics
+from rubik.action import parse_actions_str
+from rubik.cube import Cube
+
+
+def test_collect():
+    """
+    Test that "collect" records calls to instrumented functions within its context only.
+    """
+    cube = Cube(3)
+    metrics.reset()
+    cube.rotate("X0 Y1")
+    assert metrics.snapshot() == {}, "metrics are recorded while disabled"
+
+    with metrics.collect():
+        cube.rotate("X0 Y1 Z2i")
+        cube.compose_moves("X0 X1")
+    observed = metrics.snapshot()
+    assert observed["Cube.rotate_once"]["count"] == 3, "'Cube.rotate_once' calls are not all recorded"
+    assert sum(observed["Cube.rotate_once"]["buckets"]) == 3, "'Cube.rotate_once' latencies are not all recorded"
+    assert observed["Cube.compose_moves"]["bytes"] >= 54 * 8, "'Cube.compose_moves' output bytes are not recorded"
+    assert not metrics.is_enabled(), "'collect' does not restore the previous state"
+
+
+def test_format_prometheus():
+    """
+    Test that "format_prometheus" exposes cumulative histograms and counters.
+    """
+    metrics.reset()
+    with metrics.collect():
+        parse_actions_str("X0 Y1", 3)
+    text = metrics.format_prometheus()
+    assert 'rubik_call_duration_seconds_bucket{function="parse_actions_str",le="+Inf"} 1' in text, text
+    assert 'rubik_call_duration_seconds_count{function="parse_actions_str"} 1' in text, text
+    assert 'rubik_call_output_bytes_total{function="parse_actions_str"} 0' in text, text
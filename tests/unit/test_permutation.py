@@ -0,0 +1,79 @@
+import pytest
+
+import torch
+
+from rubik.cube import Cube
+from rubik.permutation import cycle_decomposition, generate_permutation_group, permutation_order, permutation_power
+
+
+@pytest.mark.parametrize(
+    "permutation, expected",
+    [
+        ([0, 1, 2], [[0], [1], [2]]),
+        ([1, 2, 0], [[0, 1, 2]]),
+        ([1, 0, 3, 4, 2], [[0, 1], [2, 3, 4]]),
+    ],
+)
+def test_cycle_decomposition(permutation: list[int], expected: list[list[int]]):
+    """
+    Test that "cycle_decomposition" behaves as expected.
+    """
+    observed = cycle_decomposition(torch.tensor(permutation))
+    assert expected == observed, f"'cycle_decomposition' output is incorrect: expected '{expected}', got '{observed}'"
+
+
+@pytest.mark.parametrize(
+    "permutation, expected",
+    [
+        ([0, 1, 2], 1),
+        ([1, 2, 0], 3),
+        ([1, 0, 3, 4, 2], 6),
+    ],
+)
+def test_permutation_order(permutation: list[int], expected: int):
+    """
+    Test that "permutation_order" behaves as expected.
+    """
+    observed = permutation_order(torch.tensor(permutation))
+    assert expected == observed, f"'permutation_order' output is incorrect: expected '{expected}', got '{observed}'"
+
+
+@pytest.mark.parametrize("moves", ["X0", "X0 Y1", "X2 X1i Y1i Z1i Y0 Z0i"])
+def test_permutation_order_cube(moves: str):
+    """
+    Test that applying a sequence of moves as many times as its order leaves the cube unchanged.
+    """
+    cube = Cube(3)
+    changes = cube.compose_moves(moves)
+    order = permutation_order(changes)
+    state = cube.state.clone()
+    for _ in range(order - 1):
+        cube.rotate(moves)
+        assert not torch.equal(state, cube.state), f"sequence '{moves}' has order lower than {order}"
+    cube.rotate(moves)
+    assert torch.equal(state, cube.state), f"sequence '{moves}' does not have order {order}"
+
+
+@pytest.mark.parametrize("exponent", [-7, -1, 0, 1, 2, 5, 31, 10**30])
+def test_permutation_power(exponent: int):
+    """
+    Test that "permutation_power" matches repeated application of a permutation.
+    """
+    permutation = torch.randperm(50)
+    steps = exponent % permutation_order(permutation)
+    expected = torch.arange(50)
+    for _ in range(steps):
+        expected = torch.gather(expected, 0, permutation)
+    observed = permutation_power(permutation, exponent)
+    assert torch.equal(expected, observed), f"'permutation_power' output is incorrect for exponent {exponent}"
+
+
+@pytest.mark.parametrize("generators, expected", [([[1, 0, 2]], 2), ([[1, 2, 0]], 3), ([[1, 0, 2], [1, 2, 0]], 6)])
+def test_generate_permutation_group(generators: list[list[int]], expected: int):
+    """
+    Test that "generate_permutation_group" returns all distinct permutations, identity first.
+    """
+    group = generate_permutation_group([torch.tensor(generator) for generator in generators])
+    assert len(group) == expected, f"'generate_permutation_group' output is incorrect: expected {expected} elements"
+    assert len(group.unique(dim=0)) == len(group), "'generate_permutation_group' output has duplicates"
+    assert group[0].tolist() == [0, 1, 2], "'generate_permutation_group' output does not start with identity"
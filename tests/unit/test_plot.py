@@ -0,0 +1,171 @@
+import numpy as np
+import pytest
+
+import torch
+
+from rubik.cube import Cube
+from rubik.interface.plot import CubeVisualizer
+from rubik.state import build_cube_tensor
+
+
+# steps from the first corner of a facelet to the other corners of its 2 triangles, as in the per-facelet construction
+SHIFTS = [
+    [(0, 1, 0), (1, 0, 0), (1, 1, 0)],  # Up
+    [(0, 1, 0), (0, 0, 1), (0, 1, 1)],  # Left
+    [(1, 0, 0), (0, 0, 1), (1, 0, 1)],  # Front
+    [(0, 1, 0), (0, 0, 1), (0, 1, 1)],  # Right
+    [(1, 0, 0), (0, 0, 1), (1, 0, 1)],  # Back
+    [(0, 1, 0), (1, 0, 0), (1, 1, 0)],  # Down
+]
+
+
+def build_reference_triangles(size: int) -> list[set[tuple[int, ...]]]:
+    """
+    Compute the vertices of the 2 triangles covering each facelet one at a time, in the order of the mesh.
+    """
+    (faces, x, y, z) = build_cube_tensor(size).indices().tolist()
+    triangles: list[set[tuple[int, ...]]] = []
+    for face in range(6):
+        corners = [
+            (size if face == 3 else xx, size if face == 2 else yy, size if face == 0 else zz)
+            for f, xx, yy, zz in zip(faces, x, y, z)
+            if f == face
+        ]
+        shifted = [[tuple(c + s for c, s in zip(corner, shift)) for shift in SHIFTS[face]] for corner in corners]
+        triangles += [{corner, s0, s1} for corner, (s0, s1, _) in zip(corners, shifted)]
+        triangles += [{s2, s0, s1} for s0, s1, s2 in shifted]
+    return triangles
+
+
+def build_facelet_squares(size: int) -> list[set[tuple[int, ...]]]:
+    """
+    Compute the 4 corners of each facelet, in the order of the cube state.
+    """
+    (faces, x, y, z) = build_cube_tensor(size).indices().tolist()
+    squares = []
+    for f, xx, yy, zz in zip(faces, x, y, z):
+        corner = (size if f == 3 else xx, size if f == 2 else yy, size if f == 0 else zz)
+        squares.append({corner} | {tuple(c + s for c, s in zip(corner, shift)) for shift in SHIFTS[f]})
+    return squares
+
+
+class TestCubeVisualizer:
+    """
+    A testing class for the CubeVisualizer class.
+    """
+
+    @pytest.mark.parametrize("size", [2, 3, 5])
+    def test_build_triangles(self, size: int):
+        """
+        Test that the .build_triangles method matches the per-facelet construction of triangles.
+        """
+        visualizer = CubeVisualizer(size)
+        vertices = [tuple(vertex) for vertex in visualizer.vertices.tolist()]
+        observed = [
+            {vertices[i], vertices[j], vertices[k]}
+            for i, j, k in zip(visualizer.i_coor, visualizer.j_coor, visualizer.k_coor)
+        ]
+        assert observed == build_reference_triangles(size), "method 'build_triangles' output is incorrect"
+
+    @pytest.mark.parametrize("size", [2, 10])
+    def test_nbytes(self, size: int):
+        """
+        Test that the .nbytes property counts the geometry along with the base figure.
+        """
+        visualizer = CubeVisualizer(size)
+        geometry = visualizer.vertices.nbytes + 3 * visualizer.i_coor.nbytes
+        assert visualizer.nbytes > geometry, "property 'nbytes' does not count the base figure"
+        assert CubeVisualizer(2 * size).nbytes > visualizer.nbytes, "property 'nbytes' does not grow with size"
+
+    @pytest.mark.parametrize("size, moves", [[2, "X0"], [3, "Y1i"], [4, "Z3 X0"]])
+    def test_patch(self, size: int, moves: str):
+        """
+        Test that the .patch method recolors exactly the 2 triangles of each facelet that changed.
+        """
+        visualizer = CubeVisualizer(size)
+        cube = Cube(size)
+        initial = visualizer.patch(cube.state)
+        assert sorted(initial["indices"]) == list(range(12 * size**2)), "method 'patch' does not color all triangles"
+
+        previous = cube.state.clone()
+        cube.rotate(moves)
+        observed = visualizer.patch(cube.state)
+
+        # triangles of a facelet are those lying within its square
+        (triangles, squares) = (build_reference_triangles(size), build_facelet_squares(size))
+        expected = {}
+        for facelet in (cube.state != previous).nonzero().reshape(-1).tolist():
+            color = visualizer.palette[int(cube.state[facelet]) - 1]
+            expected.update({index: color for index, t in enumerate(triangles) if t <= squares[facelet]})
+        assert len(expected) == 2 * int((cube.state != previous).sum()), "facelets are not covered by 2 triangles"
+        assert dict(zip(observed["indices"], observed["colors"])) == expected, "method 'patch' output is incorrect"
+
+    @pytest.mark.parametrize("size", [2, 3])
+    def test_update(self, size: int):
+        """
+        Test that the .update method colors the figure as a full render does, after several moves.
+        """
+        visualizer = CubeVisualizer(size)
+        cube = Cube(size)
+        visualizer.update(cube.state)
+        for moves in ["X0", "Y1i Z0", ""]:
+            cube.rotate(moves)
+            observed = list(visualizer.update(cube.state).data[-1].facecolor)
+            expected = list(visualizer(cube.coordinates, cube.state, size).data[-1].facecolor)
+            assert observed == expected, f"method 'update' output is incorrect after moves '{moves}'"
+
+    def test_update_merged(self):
+        """
+        Test that the .update method keeps track of the displayed state when merging facelets.
+        """
+        visualizer = CubeVisualizer(4, merge_size=0)
+        cube = Cube(4)
+        visualizer.update(cube.state)
+        cube.rotate("X1")
+        observed = len(visualizer.patch(cube.state)["indices"])
+        assert observed == 2 * 4 * 4, f"method 'update' leaves a patch of {observed} triangles after a single move"
+
+    @pytest.mark.parametrize("size, num_moves", [[3, 0], [4, 5], [6, 50]])
+    def test_build_merged_triangles(self, size: int, num_moves: int):
+        """
+        Test that the .build_merged_triangles method covers each facelet by a single quad of its color,
+        faces of a solved cube being drawn as a single quad.
+        """
+        visualizer = CubeVisualizer(size, merge_size=0)
+        cube = Cube(size)
+        cube.scramble(num_moves, seed=size)
+        (i_coor, _, _, facecolor) = visualizer.build_merged_triangles(cube.state)
+
+        # a quad spans the box between the first corner of its first triangle and that of its second triangle
+        num_quads = len(i_coor) // 2
+        vertices = torch.tensor(visualizer.vertices, dtype=torch.float32)
+        corners = vertices[torch.tensor(i_coor)].reshape(2, num_quads, 3)
+        (low, high) = (corners.min(dim=0).values, corners.max(dim=0).values)
+
+        centers = torch.tensor(
+            [[sum(c) / len(c) for c in zip(*square)] for square in build_facelet_squares(size)], dtype=torch.float32
+        )
+        inside = ((centers.unsqueeze(1) >= low) & (centers.unsqueeze(1) <= high)).all(dim=-1)  # size = (L, Q)
+        assert (inside.sum(dim=-1) == 1).all(), "method 'build_merged_triangles' does not cover each facelet once"
+        if num_moves == 0:
+            assert num_quads == 6, f"method 'build_merged_triangles' draws solved faces with {num_quads} quads"
+        observed = [facecolor[quad] for quad in inside.to(dtype=torch.int64).argmax(dim=-1).tolist()]
+        expected = visualizer.palette[(cube.state - 1).numpy()].tolist()
+        assert observed == expected, "method 'build_merged_triangles' colors facelets incorrectly"
+
+    @pytest.mark.parametrize("size", [2, 5])
+    def test_build_net_figure(self, size: int):
+        """
+        Test that the .build_net_figure method colors each facelet of the net like the face it is displayed on.
+        """
+        visualizer = CubeVisualizer(size)
+        cube = Cube(size)
+        cube.scramble(20, seed=size)
+        grid = np.array(visualizer.build_net_figure(cube.facelets, cube.colors).data[0].z, dtype=np.float64)
+
+        origins = [(0, size), (size, 0), (size, size), (size, 2 * size), (size, 3 * size), (2 * size, size)]
+        for face, (row, col) in zip(cube.facelets, origins):
+            expected = [[cube.colors.index(color) for color in line] for line in face]
+            observed = grid[row : row + size, col : col + size].tolist()
+            assert observed == expected, "method 'build_net_figure' colors facelets incorrectly"
+        assert int(np.isnan(grid).sum()) == 6 * size**2, "method 'build_net_figure' fills cells outside the net"
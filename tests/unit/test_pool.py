@@ -0,0 +1,54 @@
+import threading
+import time
+
+import torch
+
+from rubik.interface.pool import ResourcePool
+
+
+def test_resource_pool_shares():
+    """
+    Test that "ResourcePool" builds each resource once.
+    """
+    calls = []
+    pool = ResourcePool({"zeros": lambda size: calls.append(size) or torch.zeros(size)})
+    (first, second) = (pool.get("zeros", 3), pool.get("zeros", 3))
+    assert first is second, "'ResourcePool' does not share resources"
+    assert calls == [3], f"'ResourcePool' builds resources several times: {calls}"
+    assert pool.nbytes == 12, f"'ResourcePool' counts {pool.nbytes} bytes instead of 12"
+
+
+def test_resource_pool_evicts():
+    """
+    Test that "ResourcePool" evicts least recently used resources beyond its capacity.
+    """
+    pool = ResourcePool({"zeros": lambda size: torch.zeros(size, dtype=torch.uint8)}, max_bytes=10)
+    for size in [4, 5, 4, 6]:
+        pool.get("zeros", size)
+    assert ("zeros", 5) not in pool and ("zeros", 4) in pool, "'ResourcePool' does not evict least recently used"
+    assert pool.nbytes == 10, f"'ResourcePool' counts {pool.nbytes} bytes instead of 10"
+
+    pool.get("zeros", 20)
+    assert len(pool) == 1 and pool.nbytes == 20, "'ResourcePool' does not keep the most recently used resource"
+
+
+def test_resource_pool_coalesces():
+    """
+    Test that concurrent requests of a resource being built share a single build.
+    """
+    calls = []
+
+    def build(size: int) -> torch.Tensor:
+        calls.append(size)
+        time.sleep(0.1)
+        return torch.zeros(size)
+
+    pool = ResourcePool({"zeros": build})
+    outputs = []
+    threads = [threading.Thread(target=lambda: outputs.append(pool.get("zeros", 3))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [3], f"'ResourcePool' builds resources several times: {calls}"
+    assert all(output is outputs[0] for output in outputs), "'ResourcePool' does not share resources"
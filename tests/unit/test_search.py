@@ -0,0 +1,72 @@
+import pytest
+
+import torch
+
+from rubik.action import sample_actions_str
+from rubik.cube import Cube
+from rubik.search import MoveSearch, search
+
+
+@pytest.mark.parametrize("size, moves, expected", [[3, "", [""]], [3, "X0", ["X0i"]], [2, "Y1i", ["Y1"]]])
+def test_search(size: int, moves: str, expected: list[str]):
+    """
+    Test that "search" finds sequences of moves restoring the initial state.
+    """
+    cube = Cube(size)
+    cube.rotate(moves)
+    observed = search(cube)
+    assert expected == observed, f"'search' output is incorrect: expected '{expected}', got '{observed}'"
+
+
+def test_search_all_shortest():
+    """
+    Test that "search" returns all shortest sequences of moves.
+    """
+    cube = Cube(3)
+    cube.rotate("X0 X1 X2")
+    observed = search(cube, max_depth=4)
+    assert "X0i X1i X2i" in observed and "X2i X0i X1i" in observed, f"'search' output is incomplete: {observed}"
+    assert len(observed) == len(set(observed)), f"'search' output has duplicates: {observed}"
+    for moves in observed:
+        solved = Cube(3)
+        solved.rotate("X0 X1 X2 " + moves)
+        assert len(moves.split()) == 3, f"'search' output is not shortest: '{moves}'"
+        assert torch.equal(solved.state, Cube(3).state), f"'search' output does not solve the cube: '{moves}'"
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_search_bidirectional(seed: int):
+    """
+    Test that searches from both ends agree with a forward search.
+    """
+    cube = Cube(2)
+    cube.rotate(sample_actions_str(4, 2, seed))
+    engine = MoveSearch(cube)
+    expected = sorted(engine.search_forward(torch.ones(24, dtype=torch.bool), 4))
+    observed = sorted(engine.search_bidirectional(4))
+    assert expected == observed, "searches from both ends disagree with a forward search"
+
+
+def test_search_mask():
+    """
+    Test that "search" only constrains masked facelets.
+    """
+    cube = Cube(3)
+    cube.rotate("X0 Z1 Y2i")
+    mask = torch.zeros(54, dtype=torch.bool)
+    mask[:9] = True
+    observed = search(cube, mask, max_depth=3)
+    assert len(observed), "'search' finds no sequence"
+    for moves in observed:
+        solved = Cube(3)
+        solved.rotate("X0 Z1 Y2i " + moves)
+        assert torch.equal(solved.state[mask], Cube(3).state[mask]), f"'search' output does not match mask: '{moves}'"
+
+
+def test_search_too_deep():
+    """
+    Test that "search" returns no sequence when none is short enough.
+    """
+    cube = Cube(3)
+    cube.rotate("X0 Y0 Z0")
+    assert search(cube, max_depth=2) == [], "'search' returns sequences longer than the maximal depth"
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+
+import torch
+
+from rubik.action import sample_actions_str
+from rubik.cube import Cube
+from rubik.solve import build_pattern_database, get_facelet_permutation, get_pattern_groups, solve
+
+
+@pytest.mark.parametrize("size, expected", [[2, [4, 4]], [3, [4, 4, 4, 4, 4, 4, 2]]])
+def test_get_pattern_groups(size: int, expected: list[int]):
+    """
+    Test that "get_pattern_groups" covers all cubies once, in groups of at most 4.
+    """
+    groups = get_pattern_groups(size)
+    observed = [len(group) for group in groups]
+    assert expected == observed, f"'get_pattern_groups' output is incorrect: expected '{expected}', got '{observed}'"
+
+
+def test_build_pattern_database():
+    """
+    Test that "build_pattern_database" holds a null distance for the initial placement only.
+    """
+    database = build_pattern_database(2, 0)
+    distances = torch.stack([database & 15, database >> 4], dim=-1).reshape(-1)
+    references = get_pattern_groups(2)[0]
+    index = sum(facelet * 24 ** (len(references) - 1 - i) for i, facelet in enumerate(references))
+    assert distances[index] == 0, "'build_pattern_database' does not hold a null distance for the initial placement"
+    assert int((distances == 0).sum()) == 1, "'build_pattern_database' holds several null distances"
+
+
+@pytest.mark.parametrize("size, moves", [[2, "X0 Y1i Z0"], [3, "X1 Z2i Y0"]])
+def test_get_facelet_permutation(size: int, moves: str):
+    """
+    Test that "get_facelet_permutation" matches the composition of moves.
+    """
+    cube = Cube(size)
+    cube.rotate(moves)
+    expected = Cube(size).compose_moves(moves)
+    observed = get_facelet_permutation(cube)
+    assert torch.equal(expected, observed), "'get_facelet_permutation' output is incorrect"
+
+
+@pytest.mark.parametrize(
+    "size, moves, expected",
+    [
+        [2, "", 0],
+        [2, "X0", 1],
+        [2, "X0 X1", 2],
+        [3, "X1 Z2i", 2],
+    ],
+)
+def test_solve(tmp_path: Path, size: int, moves: str, expected: int):
+    """
+    Test that "solve" finds a shortest sequence of moves bringing a cube back to its initial state.
+    """
+    cube = Cube(size)
+    cube.rotate(moves)
+    solution = solve(cube, cache_dir=tmp_path)
+    assert len(solution.split()) == expected, f"'solve' output has not the expected length: '{solution}'"
+
+    cube.rotate(solution)
+    assert torch.equal(cube.state, Cube(size).state), f"'solve' output does not solve the cube: '{solution}'"
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_solve_scramble(tmp_path: Path, seed: int):
+    """
+    Test that "solve" solves scrambled cubes in no more moves than the scramble.
+    """
+    moves = sample_actions_str(8, 2, seed)
+    cube = Cube(2)
+    cube.rotate(moves)
+    solution = solve(cube, cache_dir=tmp_path)
+    assert len(solution.split()) <= len(moves.split()), f"'solve' output is longer than the scramble: '{solution}'"
+
+    cube.rotate(solution)
+    assert torch.equal(cube.state, Cube(2).state), f"'solve' output does not solve the cube: '{solution}'"
+
+
+def test_solve_invalid_size():
+    """
+    Test that "solve" raises an error on unsupported sizes.
+    """
+    with pytest.raises(ValueError, match="size"):
+        solve(Cube(4))
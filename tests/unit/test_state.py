@@ -2,7 +2,16 @@ import pytest
 
 import torch
 
-from rubik.state import build_cube_tensor, build_permutation_matrix
+from rubik.action import build_actions_tensor, build_rotations_tensor, sample_actions_str
+from rubik.cube import Cube
+from rubik.state import (
+    build_cube_tensor,
+    build_permutation_matrix,
+    hash_canonical_states,
+    hash_states,
+    pack_state,
+    unpack_state,
+)
 
 
 @pytest.mark.parametrize("size", [2, 3, 5, 20])
@@ -36,3 +45,47 @@ def test_build_permutation_matrix(size: int, perm: str):
     mapping = dict(matrix.indices().transpose(0, 1).tolist())
     for i, j in zip(perm, perm[1:] + perm[0]):
         assert mapping[int(i)] == int(j), f"'build_permutation_matrix' outputs has wrong behavior: {perm}, {mapping}"
+
+
+@pytest.mark.parametrize("shape", [(24,), (5, 54), (2, 3, 150)])
+def test_pack_state(shape: tuple[int, ...]):
+    """
+    Test that "unpack_state" reverts "pack_state", which uses 3 bits per facelet.
+    """
+    states = torch.randint(0, 8, shape)
+    packed = pack_state(states)
+    assert packed.dtype == torch.uint8, f"'pack_state' output has incorrect dtype {packed.dtype}"
+    assert packed.shape[-1] == (3 * shape[-1] + 7) // 8, f"'pack_state' output has incorrect shape {packed.shape}"
+    assert torch.equal(unpack_state(packed, shape[-1]), states), "'unpack_state' output is incorrect"
+
+
+def test_hash_states():
+    """
+    Test that "hash_states" is deterministic, and tells apart states differing by a single move.
+    """
+    cube = Cube(3)
+    states = [cube.state.clone()]
+    for move in sample_actions_str(100, 3, seed=0).split():
+        cube.rotate(move)
+        states.append(cube.state.clone())
+    hashes = hash_states(torch.stack(states))
+    assert hashes.dtype == torch.int64, f"'hash_states' output has incorrect dtype {hashes.dtype}"
+    assert torch.equal(hashes[0], hash_states(states[0])), "'hash_states' is not deterministic"
+    assert len(set(hashes.tolist())) == len(set(tuple(state.tolist()) for state in states)), (
+        "'hash_states' output has collisions"
+    )
+
+
+@pytest.mark.parametrize("size", [2, 3])
+def test_hash_canonical_states(size: int):
+    """
+    Test that "hash_canonical_states" is the same for all orientations of a cube.
+    """
+    rotations = build_rotations_tensor(build_actions_tensor(size))
+    cube = Cube(size)
+    cube.scramble(50)
+    hashes = hash_canonical_states(cube.state[rotations], rotations)
+    assert len(set(hashes.tolist())) == 1, "'hash_canonical_states' differs between orientations of a cube"
+    assert hash_canonical_states(cube.state, rotations) != hash_canonical_states(Cube(size).state, rotations), (
+        "'hash_canonical_states' does not tell apart different cubes"
+    )
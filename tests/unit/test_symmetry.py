@@ -0,0 +1,41 @@
+import pytest
+
+import torch
+
+from rubik.action import sample_actions_str
+from rubik.cube import Cube
+from rubik.state import build_cube_tensor
+from rubik.symmetry import apply_symmetries, build_symmetries, canonicalize_states
+
+
+@pytest.mark.parametrize("size", [2, 3, 4])
+@pytest.mark.parametrize("reflections, expected", [[False, 24], [True, 48]])
+def test_build_symmetries(size: int, reflections: bool, expected: int):
+    """
+    Test that "build_symmetries" returns distinct symmetries leaving the initial state unchanged.
+    """
+    (permutations, relabelings) = build_symmetries(size, reflections)
+    assert len(permutations) == expected, f"'build_symmetries' output is incorrect: expected {expected} symmetries"
+    assert len(permutations.unique(dim=0)) == expected, "'build_symmetries' output has duplicates"
+
+    initial = build_cube_tensor(size).values()
+    symmetrics = apply_symmetries(initial, permutations, relabelings)
+    assert (symmetrics == initial).all(), "'build_symmetries' output does not leave the initial state unchanged"
+
+
+@pytest.mark.parametrize("size, seed", [[2, 0], [3, 1], [4, 2]])
+@pytest.mark.parametrize("reflections", [False, True])
+def test_canonicalize_states(size: int, seed: int, reflections: bool):
+    """
+    Test that "canonicalize_states" maps all symmetrics of a state to a single one among them.
+    """
+    cube = Cube(size)
+    cube.rotate(sample_actions_str(10, size, seed))
+    (permutations, relabelings) = build_symmetries(size, reflections)
+    symmetrics = apply_symmetries(cube.state.cpu(), permutations, relabelings)
+    (representatives, indices) = canonicalize_states(symmetrics, size, reflections)
+    assert (representatives == representatives[0]).all(), "'canonicalize_states' output differs between symmetrics"
+    assert (symmetrics == representatives[0]).all(dim=-1).any(), "'canonicalize_states' output is not a symmetric"
+
+    expected = apply_symmetries(symmetrics, permutations, relabelings)[torch.arange(len(symmetrics)), indices]
+    assert torch.equal(representatives, expected), "'canonicalize_states' indices do not match representatives"